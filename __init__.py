@@ -2,7 +2,7 @@ bl_info = {
 "name": "Gpencil refine strokes",
 "description": "Bunch of functions for post drawing strokes refining",
 "author": "Samuel Bernou",
-"version": (0, 8, 0),
+"version": (0, 9, 0),
 "blender": (2, 80, 0),
 "location": "3D view > sidebar 'N' > Gpencil > Strokes refine",
 "warning": "",
@@ -12,6 +12,7 @@ bl_info = {
 }
 
 import bpy
+from bpy.app.handlers import persistent
 
 from . import addon_updater_ops # updater
 from . import gp_selector
@@ -41,6 +42,8 @@ from bpy.types import (Operator,
 from .utils import *
 from .gpfunc import *
 from .import gp_keymaps
+from . import batch
+from . import gp_index
 
 ### -- OPERATOR --
 
@@ -82,8 +85,8 @@ class GPREFINE_OT_straighten_stroke(Operator):
         pref = context.scene.gprsettings
         L, F, S = get_context_scope(context)
         
-        for s in strokelist(t_layer=L, t_frame=F, t_stroke=S):
-            to_straight_line(s, keep_points=True, influence = self.influence_val, straight_pressure = self.homogen_pressure)
+        for strokes in iter_stroke_batches(t_layer=L, t_frame=F, t_stroke=S):
+            straighten_strokes(strokes, influence=self.influence_val, straight_pressure=self.homogen_pressure)
         return {"FINISHED"}
     
     def draw(self, context):
@@ -127,15 +130,22 @@ class GPREFINE_OT_to_circle_shape(Operator):
         L, F, S = get_context_scope(context)
 
         if self.individual_strokes or context.mode == 'PAINT_GPENCIL':#all strokes individually
-            for s in strokelist(t_layer=L, t_frame=F, t_stroke=S):
-                to_circle_cast_to_average(context.object, s.points, influence = self.influence_val, straight_pressure = self.homogen_pressure)
+            skipped = 0
+            for s in iter_strokes(t_layer=L, t_frame=F, t_stroke=S):
+                if to_circle_cast_to_average(context.object, s.points, influence = self.influence_val, straight_pressure = self.homogen_pressure):
+                    skipped += 1
+            if skipped:
+                self.report({'WARNING'}, f'{skipped} stroke(s) skipped: not enough points in front of the view')
         else:
             point_list = []
-            for s in strokelist(t_layer=L, t_frame=F, t_stroke=S):
+            for s in iter_strokes(t_layer=L, t_frame=F, t_stroke=S):
                 for p in s.points:
                     if p.select:
                         point_list.append(p)
-            to_circle_cast_to_average(context.object, point_list, influence = self.influence_val, straight_pressure = self.homogen_pressure)
+            err = to_circle_cast_to_average(context.object, point_list, influence = self.influence_val, straight_pressure = self.homogen_pressure)
+            if err:
+                self.report({'ERROR'}, err)
+                return {"CANCELLED"}
             
 
         return {"FINISHED"}
@@ -179,8 +189,13 @@ class GPREFINE_OT_polygonize(Operator):
     def execute(self, context):
         L, F, S = get_context_scope(context)
 
-        for s in strokelist(t_layer=L, t_frame=F, t_stroke=S):
-            gp_polygonize(s, tol=self.angle_tolerance, influence=self.influence_val, reduce=self.reduce, delete=self.delete)
+        try:
+            for strokes in iter_stroke_batches(t_layer=L, t_frame=F, t_stroke=S):
+                gp_polygonize_strokes(strokes,
+                    tol=self.angle_tolerance, influence=self.influence_val, reduce=self.reduce, delete=self.delete)
+        except NoViewError as e:
+            self.report({'ERROR'}, str(e))
+            return {"CANCELLED"}
 
         return {"FINISHED"}
     
@@ -198,15 +213,53 @@ class GPREFINE_OT_polygonize(Operator):
 class GPREFINE_OT_refine_ops(Operator):
     bl_idname = "gp.refine_strokes"
     bl_label = "Refine strokes"
-    bl_description = "Refine strokes with multiple different option base on layer/frame/strokes filters"
+    bl_description = "Refine strokes with multiple different option base on layer/frame/strokes filters\nOn multiple frames, Esc stop the process"
     bl_options = {"REGISTER", "UNDO"}
 
     action : StringProperty(name="Action", description="Action to do", default="REFINE", maxlen=0)
 
     def invoke(self, context, event):
         self.shift = event.shift
+        L, F, S = get_context_scope(context)
+        if F != 'ACTIVE' and self.action in batch.ACTIONS:
+            ## multiple frames: process frame batches (grouped by layer) on timer with progress
+            self.batches = frame_batches(t_layer=L, t_frame=F, t_stroke=S)
+            if len(self.batches) > 1:
+                self.func = batch.stroke_action({'action': self.action})
+                self.t_stroke = S
+                self.index = 0
+                wm = context.window_manager
+                wm.progress_begin(0, len(self.batches))
+                self._timer = wm.event_timer_add(0.01, window=context.window)
+                wm.modal_handler_add(self)
+                return {'RUNNING_MODAL'}
+
         return self.execute(context)
 
+    def modal(self, context, event):
+        if event.type == 'ESC':
+            return self.finish(context, cancelled=True)
+
+        if event.type == 'TIMER':
+            # process as much batches as possible in a short time to keep interface responsive
+            self.index = batch.run_batches(self.func, self.batches, t_stroke=self.t_stroke, start=self.index, time_limit=0.1)
+            context.window_manager.progress_update(self.index)
+            if self.index >= len(self.batches):
+                return self.finish(context)
+
+        return {'RUNNING_MODAL'}
+
+    def finish(self, context, cancelled=False):
+        wm = context.window_manager
+        wm.event_timer_remove(self._timer)
+        wm.progress_end()
+        if context.area:
+            context.area.tag_redraw()
+        if cancelled:
+            # already processed batches are kept (undo to revert)
+            self.report({'WARNING'}, f'Stopped: {self.index}/{len(self.batches)} frame batches processed')
+        return {'FINISHED'}
+
     def execute(self, context):
         pref = context.scene.gprsettings
         L, F, S = get_context_scope(context)
@@ -214,7 +267,13 @@ class GPREFINE_OT_refine_ops(Operator):
         err = None
         ## thinning
         if self.action == "THIN_RELATIVE":
-            thin_stroke_tips_percentage(tip_len=pref.percentage_tip_len, variance=pref.percentage_tip_len_random, t_layer=L, t_frame=F, t_stroke=S)
+            if pref.percentage_use_sync_tip_len:
+                tip_len, end_tip_len = pref.percentage_tip_len, None
+            else:
+                tip_len, end_tip_len = pref.percentage_start_tip_len, pref.percentage_end_tip_len
+            thin_stroke_tips_percentage(tip_len=tip_len, end_tip_len=end_tip_len, variance=pref.percentage_tip_len_random, seed=pref.percentage_tip_len_seed,
+                force_max=pref.force_max_pressure_line_body, curve=pref.tip_fade_curve, curve_points=pref.tip_fade_curve_points[:],
+                t_layer=L, t_frame=F, t_stroke=S)
         
         ## -- pressure and strength action
         if self.action == "ADD_LINE_WIDTH":
@@ -265,6 +324,9 @@ class GPREFINE_OT_refine_ops(Operator):
         if self.action == "SUB_ALPHA":
             gp_add_vg_alpha(amount= -pref.add_alpha, t_layer=L, t_frame=F, t_stroke=S)
 
+        if self.action in ("TINT_COLOR", "MULTIPLY_COLOR", "BLEND_COLOR"):
+            gp_grade_vertex_color(pref.grade_color[:], mode=self.action.split('_')[0], factor=pref.grade_factor, t_layer=L, t_frame=F, t_stroke=S)
+
         ## -- Last stroke modifications
 
         # trim
@@ -279,7 +341,7 @@ class GPREFINE_OT_refine_ops(Operator):
             err = guess_join(same_material=True, proximity_tolerance=pref.proximity_tolerance, start_point_tolerance=pref.start_point_tolerance)
 
         if self.action == "STRAIGHT_2_POINTS":
-            for s in strokelist(t_layer=L, t_frame=F, t_stroke=S):
+            for s in iter_strokes(t_layer=L, t_frame=F, t_stroke=S):
                 to_straight_line(s, keep_points=False, straight_pressure=True)
         
         # if self.action == "POLYGONIZE":# own operator for redo panel
@@ -350,7 +412,10 @@ class GPR_refine_prop(PropertyGroup):
     description="Set the tip fade lenght as a percentage of the strokes points", default=20, min=5, max=100, step=1, subtype='PERCENTAGE')
     
     percentage_tip_len_random :  IntProperty(name="Random", options={'HIDDEN'}, 
-    description="Randomize the percentage by this amount around given value\n carefull, with variance each time you relaunch this you alterate the lines", default=0, min=0, max=50, soft_max=25, step=1, subtype='PERCENTAGE')
+    description="Randomize the percentage by this amount around given value\nVariation is seeded per stroke (object, layer, frame, stroke index), relaunching give the same result", default=0, min=0, max=50, soft_max=25, step=1, subtype='PERCENTAGE')
+
+    percentage_tip_len_seed :  IntProperty(name="Seed", options={'HIDDEN'}, 
+    description="Seed of the random tip fade lenght variation", default=0, min=0)
 
     percentage_start_tip_len : IntProperty(name="Start tip fade lenght", options={'HIDDEN'}, 
     description="Set the start tip fade lenght as a percentage of the strokes points", default=20, min=5, max=100, step=1, subtype='PERCENTAGE')
@@ -362,6 +427,19 @@ class GPR_refine_prop(PropertyGroup):
     description="One the parts that are not fading, put all points pressure to the level of the maximum on the line, fade from this value on tips", 
     default=False)
 
+    tip_fade_curve : EnumProperty(name="Fade curve", options={'HIDDEN'},
+    description="Falloff profile of the pressure from line body to tip",
+    default='LINEAR',
+    items=(
+        ('LINEAR', 'Linear', 'Straight fade', 0),
+        ('EASE', 'Ease', 'Smooth fade, soft transition on tip and body', 1),
+        ('CUSTOM', 'Custom', 'Fade following custom curve values', 2),
+        ))
+
+    tip_fade_curve_points : FloatVectorProperty(name="Curve values", options={'HIDDEN'}, size=5,
+    description="Custom fade curve, pressure factor at evenly spaced positions from tip (left) to line body (right)",
+    default=(0.0, 0.5, 0.8, 0.95, 1.0), min=0.0, max=1.0)
+
     ### Line and points attributes
 
     # width (brush radius)
@@ -398,6 +476,13 @@ class GPR_refine_prop(PropertyGroup):
 
     add_alpha : FloatProperty(name="Vertex Alpha", description="Vertex color alpha to add (point color opacity)", options={'HIDDEN'}, 
     default=0.1, min=0, max=1.0, soft_min=0, soft_max=1.0, step=3, precision=2)
+
+    # vertex color grading
+    grade_color : FloatVectorProperty(name="Color", description="Color used to tint, multiply or blend points vertex color", options={'HIDDEN'},
+    subtype='COLOR', size=4, default=(1.0, 1.0, 1.0, 1.0), min=0.0, max=1.0)
+
+    grade_factor : FloatProperty(name="Factor", description="Influence of the color on points vertex color", options={'HIDDEN'},
+    default=0.5, min=0, max=1.0, step=3, precision=2, subtype='FACTOR')
     
     # auto join
     proximity_tolerance : FloatProperty(name="Detection radius", description="Proximity tolerance (Relative to view), number of point detected in range printed in console", options={'HIDDEN'}, 
@@ -415,6 +500,10 @@ class GPR_refine_prop(PropertyGroup):
     length : bpy.props.FloatProperty(name="Length", description="Length tolerance", 
     default=0.010, min=0.0, max=1000, step=0.1, precision=4, options={'HIDDEN'})
 
+    ## smart select
+    smart_query : bpy.props.StringProperty(name='Query', default='length < 0.01',
+    description='Select strokes matching conditions on strokes metadata\ne.g: length < 0.01 and mean(pressure) < 0.4 and angle ~ -45±20')
+
     ## hatching settings
     ref_angle : bpy.props.IntProperty(name='Reference Angle', default=-45, 
     description='Reference angle to match from -90 to 90\ne.g: / = -70, \ = 70, -- = 0')
@@ -477,6 +566,17 @@ GPREFINE_OT_polygonize,
 )
 
 
+## keep frame metadata index in sync with grease pencil changes
+@persistent
+def index_depsgraph_update(scene, depsgraph):
+    gp_index.tag_depsgraph_update(depsgraph)
+
+@persistent
+def index_load_post(dummy):
+    # frame and datablock pointers of the previous file can be reused
+    gp_index.frame_index_cache.clear()
+    gp_index.update_versions.clear()
+
 def register():
     addon_updater_ops.register(bl_info)# updater
     for cls in classes:
@@ -486,8 +586,12 @@ def register():
     ui.register()
 
     gp_keymaps.register()#keymaps
+    bpy.app.handlers.depsgraph_update_post.append(index_depsgraph_update)
+    bpy.app.handlers.load_post.append(index_load_post)
 
 def unregister():
+    bpy.app.handlers.load_post.remove(index_load_post)
+    bpy.app.handlers.depsgraph_update_post.remove(index_depsgraph_update)
     addon_updater_ops.unregister()# updater
     del bpy.types.Scene.gprsettings
     gp_keymaps.unregister()#keymaps
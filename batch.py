@@ -0,0 +1,220 @@
+import bpy
+import time
+from . import gpfunc
+from . import gp_buffer
+
+## Headless refine pipeline
+## Run refine actions directly on data (no operator, no 3D view needed)
+## Used by the batch_cleanup.py command line
+
+# action : (function, fixed args, default amount property in scene.gprsettings, sign)
+ATTR_ACTIONS = {
+'ADD_LINE_WIDTH': (gpfunc.gp_add_line_attr, ('line_width',), 'add_line_width', 1),
+'SUB_LINE_WIDTH': (gpfunc.gp_add_line_attr, ('line_width',), 'add_line_width', -1),
+'SET_LINE_WIDTH': (gpfunc.gp_set_line_attr, ('line_width',), 'set_line_width', 1),
+'ADD_LINE_HARDNESS': (gpfunc.gp_add_line_attr, ('hardness',), 'add_hardness', 1),
+'SUB_LINE_HARDNESS': (gpfunc.gp_add_line_attr, ('hardness',), 'add_hardness', -1),
+'SET_LINE_HARDNESS': (gpfunc.gp_set_line_attr, ('hardness',), 'set_hardness', 1),
+'ADD_PRESSURE': (gpfunc.gp_add_attr, ('pressure',), 'add_pressure', 1),
+'SUB_PRESSURE': (gpfunc.gp_add_attr, ('pressure',), 'add_pressure', -1),
+'SET_PRESSURE': (gpfunc.gp_set_attr, ('pressure',), 'set_pressure', 1),
+'ADD_STRENGTH': (gpfunc.gp_add_attr, ('strength',), 'add_strength', 1),
+'SUB_STRENGTH': (gpfunc.gp_add_attr, ('strength',), 'add_strength', -1),
+'SET_STRENGTH': (gpfunc.gp_set_attr, ('strength',), 'set_strength', 1),
+'ADD_ALPHA': (gpfunc.gp_add_vg_alpha, (), 'add_alpha', 1),
+'SUB_ALPHA': (gpfunc.gp_add_vg_alpha, (), 'add_alpha', -1),
+'SET_ALPHA': (gpfunc.gp_set_vg_alpha, (), 'set_alpha', 1),
+}
+
+OTHER_ACTIONS = (
+'TINT_COLOR',
+'MULTIPLY_COLOR',
+'BLEND_COLOR',
+'THIN_RELATIVE',
+'STRAIGHTEN',
+'STRAIGHT_2_POINTS',
+'POLYGONIZE',
+'SELECT_COPLANAR',
+)
+
+ACTIONS = tuple(ATTR_ACTIONS) + OTHER_ACTIONS
+
+
+def stroke_action(step):
+    '''
+    Return a function applying a pipeline step on a given stroke list (on frames for line attributes, see run_batches)
+    step : dict with 'action' key and optional action parameters
+    missing parameters use scene refine settings values
+    '''
+    pref = bpy.context.scene.gprsettings
+    action = step['action']
+
+    if action in ATTR_ACTIONS:
+        func, args, prop, sign = ATTR_ACTIONS[action]
+        amount = sign * step.get('amount', getattr(pref, prop))
+        if func in (gpfunc.gp_add_line_attr, gpfunc.gp_set_line_attr):
+            # stroke attributes are written on each frame strokes collection (foreach_set), not on the merged list
+            def line_attr(frames, t_stroke='SELECT'):
+                func(*args, amount=amount, frames=frames, t_stroke=t_stroke)
+            line_attr.use_frames = True
+            return line_attr
+        return lambda strokes: func(*args, amount=amount, strokes=strokes)
+
+    if action in ('TINT_COLOR', 'MULTIPLY_COLOR', 'BLEND_COLOR'):
+        color = step.get('color', pref.grade_color[:])
+        factor = step.get('factor', pref.grade_factor)
+        mode = action.split('_')[0]
+        return lambda strokes: gpfunc.gp_grade_vertex_color(color, mode=mode, factor=factor, strokes=strokes)
+
+    if action == 'THIN_RELATIVE':
+        sync = pref.percentage_use_sync_tip_len
+        tip_len = step.get('tip_len', pref.percentage_tip_len if sync else pref.percentage_start_tip_len)
+        end_tip_len = step.get('end_tip_len', None if sync else pref.percentage_end_tip_len)
+        variance = step.get('variance', pref.percentage_tip_len_random)
+        seed = step.get('seed', pref.percentage_tip_len_seed)
+        force_max = step.get('force_max', pref.force_max_pressure_line_body)
+        curve = step.get('curve', pref.tip_fade_curve)
+        curve_points = step.get('curve_points', pref.tip_fade_curve_points[:])
+        def thin_relative(strokes, seeds=None):
+            gpfunc.thin_stroke_tips_percentage(tip_len=tip_len, end_tip_len=end_tip_len, variance=variance, seed=seed, seeds=seeds,
+                force_max=force_max, curve=curve, curve_points=curve_points, strokes=strokes)
+        # variance is seeded from stroke location, reproducible between runs and workers
+        thin_relative.use_seeds = True
+        return thin_relative
+
+    if action == 'STRAIGHTEN':
+        def straighten(strokes):
+            gpfunc.straighten_strokes(strokes, influence=step.get('influence', 100),
+                straight_pressure=step.get('straight_pressure', False))
+        return straighten
+
+    if action == 'STRAIGHT_2_POINTS':
+        def straight_2_points(strokes):
+            for s in strokes:
+                gpfunc.to_straight_line(s, keep_points=False, straight_pressure=True)
+        return straight_2_points
+
+    if action == 'POLYGONIZE':
+        # screen space angles: without 3D view, projection use scene camera
+        def polygonize(strokes):
+            gpfunc.gp_polygonize_strokes(strokes, tol=step.get('tol', pref.poly_angle_tolerance), influence=step.get('influence', 100),
+                reduce=step.get('reduce', False), delete=step.get('delete', False))
+        return polygonize
+
+    if action == 'SELECT_COPLANAR':
+        def select_coplanar(strokes):
+            coplanar, _normals = gpfunc.get_coplanar_strokes(strokes, tol=step.get('tol', 0.0002))
+            gp_buffer.set_strokes_attr(strokes, 'select', coplanar ^ step.get('invert', False))
+        return select_coplanar
+
+    raise ValueError(f'Unknown action "{action}", choose in {ACTIONS}')
+
+
+## Frame scheduler: target frames grouped by layer, each batch of frames is processed with one bulk buffer
+
+def run_batches(func, batches, t_stroke='SELECT', start=0, time_limit=None):
+    '''
+    Apply func on strokes of frame batches (from gpfunc.frame_batches) starting at index start
+    func with use_seeds attribute also receive per stroke seeds (gpfunc.batch_strokes_seeds)
+    func with use_frames attribute receive the frames and stroke target instead of strokes
+    time_limit : stop after this number of seconds (at least one batch is processed)
+    return index of the next batch to process (len(batches) when done)
+    '''
+    begin = time.perf_counter()
+    i = start
+    while i < len(batches):
+        layer, frames = batches[i]
+        if getattr(func, 'use_frames', False):
+            func(frames, t_stroke=t_stroke)
+        elif getattr(func, 'use_seeds', False):
+            strokes, seeds = gpfunc.batch_strokes_seeds(layer, frames, t_stroke=t_stroke)
+            if strokes:
+                func(strokes, seeds=seeds)
+        else:
+            strokes = gpfunc.batch_strokes(frames, t_stroke=t_stroke)
+            if strokes:
+                func(strokes)
+        i += 1
+        if time_limit is not None and time.perf_counter() - begin > time_limit:
+            break
+    return i
+
+
+def run_action(step, t_layer='ALL', t_frame='ACTIVE', t_stroke='SELECT'):
+    '''Apply one pipeline step on active object, frame batch by frame batch'''
+    func = stroke_action(step)
+    run_batches(func, gpfunc.frame_batches(t_layer=t_layer, t_frame=t_frame, t_stroke=t_stroke), t_stroke=t_stroke)
+
+
+def select_frame_range(objects, start, end):
+    '''
+    Select only keyframes within start-end (included) on all layers, to use with frame target SELECT
+    return previous selection as (frame, select) pairs (see restore_frame_selection)
+    '''
+    saved = []
+    for ob in objects:
+        for l in ob.data.layers:
+            for f in l.frames:
+                saved.append((f, f.select))
+                f.select = start <= f.frame_number <= end
+    return saved
+
+def restore_frame_selection(saved):
+    '''Set back keyframes selection returned by select_frame_range'''
+    for f, select in saved:
+        f.select = select
+
+
+def merge_frames_from(objects, filepath, start):
+    '''
+    Replace keyframes from start onward of objects layers by the ones of the same data in filepath
+    (a copy of the file processed on a frame range starting at start, see batch_pool.py --chunk)
+    Copied frames are appended after the kept ones (frames.copy add at the end of the list):
+    frames after the processed range come from the copy too, merge chunks by increasing start.
+    Layers are matched by name, return number of merged keyframes
+    '''
+    names = list(dict.fromkeys(ob.data.name for ob in objects))# objects can share data
+    with bpy.data.libraries.load(filepath, link=False) as (data_from, data_to):
+        names = [n for n in names if n in data_from.grease_pencils]
+        data_to.grease_pencils = names
+    parts = {n: gp for n, gp in zip(names, data_to.grease_pencils) if gp is not None}
+
+    merged = 0
+    for name, part in parts.items():
+        part_layers = {l.info: l for l in part.layers}
+        for l in bpy.data.grease_pencils[name].layers:
+            src = part_layers.get(l.info)
+            if src is None:
+                continue
+            for f in [f for f in l.frames if f.frame_number >= start]:
+                l.frames.remove(f)
+            for f in src.frames:
+                if f.frame_number >= start:
+                    l.frames.copy(f)
+                    merged += 1
+    for part in parts.values():
+        bpy.data.grease_pencils.remove(part)
+    return merged
+
+
+def run_pipeline(steps, objects=None, t_layer='ALL', t_frame='ACTIVE', t_stroke='SELECT'):
+    '''
+    Apply pipeline steps on given GP objects (default: all grease pencil objects of the scene)
+    Each step can override targets with 'layer', 'frame', 'stroke' keys
+    return list of timing infos (one dict per object and step)
+    '''
+    if objects is None:
+        objects = [o for o in bpy.context.scene.objects if o.type == 'GPENCIL']
+
+    timings = []
+    view_layer = bpy.context.view_layer
+    for ob in objects:
+        view_layer.objects.active = ob# gpfunc filters work on active object
+        for step in steps:
+            start = time.perf_counter()
+            run_action(step,
+                t_layer=step.get('layer', t_layer),
+                t_frame=step.get('frame', t_frame),
+                t_stroke=step.get('stroke', t_stroke))
+            timings.append({'object': ob.name, 'action': step['action'], 'time': time.perf_counter() - start})
+    return timings
@@ -0,0 +1,204 @@
+'''
+Headless batch cleanup of grease pencil strokes
+
+Run refine actions on .blend files without interface:
+    blender --background --python batch_cleanup.py -- shot_010.blend shot_020.blend --pipeline cleanup.json
+
+Pipeline json file:
+{
+    "targets": {"layer": "ALL", "frame": "ALL", "stroke": "ALL"},
+    "objects": ["GP_lines"],
+    "steps": [
+        {"action": "THIN_RELATIVE", "tip_len": 20, "variance": 5, "seed": 0},
+        {"action": "SET_PRESSURE", "amount": 1.0},
+        {"action": "POLYGONIZE", "tol": 40, "stroke": "SELECT"}
+    ]
+}
+"objects" is optional (default all grease pencil objects)
+Action parameters are optional, missing ones use the file refine settings values.
+Screen space actions (POLYGONIZE) use the scene camera, a file without camera is reported as failed ("error" in report).
+Steps can also be passed directly with --actions (e.g: --actions THIN_RELATIVE SET_PRESSURE)
+--frame-range restrict the process to keyframes in range (frame target is forced to selected keyframes)
+To spread many files or frame ranges over multiple blender processes, see batch_pool.py
+
+Merge frame range copies (saved with --frame-range and --output-suffix) back into one file, no step is run:
+    blender --background --python batch_cleanup.py -- shot.blend --merge shot_f0001-0100.blend 1 100 --merge shot_f0101-0200.blend 101 200
+'''
+
+import sys
+import os
+import json
+import time
+import argparse
+import importlib
+
+
+def get_addon():
+    '''Import (and register if needed) the addon package containing this script'''
+    import bpy
+    addon_dir = os.path.dirname(os.path.abspath(__file__))
+    parent, name = os.path.split(addon_dir)
+    if parent not in sys.path:
+        sys.path.insert(0, parent)
+    addon = importlib.import_module(name)
+    if not hasattr(bpy.types.Scene, 'gprsettings'):
+        addon.register()
+    return importlib.import_module(f'{name}.batch')
+
+
+def load_pipeline(args):
+    pipeline = {}
+    if args.pipeline:
+        with open(args.pipeline, 'r') as fd:
+            pipeline = json.load(fd)
+    steps = pipeline.get('steps', [])
+    steps += [{'action': a} for a in args.actions or []]
+    targets = pipeline.get('targets', {})
+    for key in ('layer', 'frame', 'stroke'):
+        if getattr(args, key):
+            targets[key] = getattr(args, key)
+    return steps, targets, pipeline.get('objects')
+
+
+def process_file(batch, filepath, steps, targets, object_names=None, output=None, save=True, frame_range=None):
+    '''Open a blend, apply pipeline, save, return report dict'''
+    import bpy
+    utils = importlib.import_module(f'{batch.__package__}.utils')
+    start = time.perf_counter()
+    bpy.ops.wm.open_mainfile(filepath=filepath)
+
+    if object_names:
+        objects = [bpy.data.objects[n] for n in object_names if n in bpy.data.objects]
+    else:
+        objects = [o for o in bpy.context.scene.objects if o.type == 'GPENCIL']
+
+    selection = None
+    if frame_range:
+        selection = batch.select_frame_range(objects, *frame_range)
+        targets = dict(targets, frame='SELECT')
+        steps = [{k: v for k, v in step.items() if k != 'frame'} for step in steps]
+
+    try:
+        timings = batch.run_pipeline(steps, objects=objects,
+            t_layer=targets.get('layer', 'ALL'),
+            t_frame=targets.get('frame', 'ACTIVE'),
+            t_stroke=targets.get('stroke', 'SELECT'))
+    except utils.NoViewError as e:
+        # same result on every run: reported as a failed file (not saved), not raised
+        return {
+            'file': filepath,
+            'frame_range': frame_range,
+            'output': None,
+            'steps': [],
+            'error': str(e),
+            'total': time.perf_counter() - start,
+            }
+    finally:
+        # the saved file keep its keyframes selection
+        if selection:
+            batch.restore_frame_selection(selection)
+
+    if save:
+        bpy.ops.wm.save_as_mainfile(filepath=output or filepath)
+
+    return {
+        'file': filepath,
+        'frame_range': frame_range,
+        'output': (output or filepath) if save else None,
+        'steps': timings,
+        'total': time.perf_counter() - start,
+        }
+
+
+def merge_file(batch, filepath, parts, output=None, save=True):
+    '''
+    Open a blend, replace its keyframes by the ones of frame range copies, save, return report dict
+    parts : list of (copy filepath, start, end)
+    '''
+    import bpy
+    start_time = time.perf_counter()
+    bpy.ops.wm.open_mainfile(filepath=filepath)
+    objects = [o for o in bpy.data.objects if o.type == 'GPENCIL']
+    merged = []
+    for part, start, end in sorted(parts, key=lambda p: p[1]):
+        count = batch.merge_frames_from(objects, part, start)
+        merged.append({'file': part, 'frame_range': [start, end], 'frames': count})
+    scene = bpy.context.scene
+    scene.frame_set(scene.frame_current)# refresh active frames
+
+    if save:
+        bpy.ops.wm.save_as_mainfile(filepath=output or filepath)
+
+    return {
+        'file': filepath,
+        'output': (output or filepath) if save else None,
+        'merged': merged,
+        'total': time.perf_counter() - start_time,
+        }
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+
+    parser = argparse.ArgumentParser(description='Apply GP refine actions on blend files (run with blender --background --python)')
+    parser.add_argument('files', nargs='+', help='Blend files to process')
+    parser.add_argument('--pipeline', help='Json file describing targets and steps')
+    parser.add_argument('--actions', nargs='*', help='Actions to apply (after pipeline steps), with default parameters')
+    parser.add_argument('--layer', choices=('ALL', 'SELECT', 'ACTIVE', 'UNRESTRICTED'), help='Layer target (override pipeline)')
+    parser.add_argument('--frame', choices=('ACTIVE', 'ALL', 'SELECT'), help='Frame target (override pipeline)')
+    parser.add_argument('--stroke', choices=('SELECT', 'ALL', 'LAST'), help='Stroke target (override pipeline)')
+    parser.add_argument('--frame-range', nargs=2, type=int, metavar=('START', 'END'), help='Only process keyframes in this range (included)')
+    parser.add_argument('--output-dir', help='Save processed files in this folder instead of overwriting')
+    parser.add_argument('--output-suffix', default='', help='Suffix added to saved file names (before extension)')
+    parser.add_argument('--no-save', action='store_true', help='Do not save files (timings only)')
+    parser.add_argument('--merge', nargs=3, action='append', metavar=('COPY', 'START', 'END'),
+        help='Merge keyframes of a frame range copy into the file instead of running steps (repeat for each copy)')
+    parser.add_argument('--report', help='Write timings report to this json file')
+    args = parser.parse_args(argv)
+
+    try:
+        parts = [(os.path.abspath(f), int(start), int(end)) for f, start, end in args.merge or ()]
+    except ValueError:
+        parser.error('--merge START and END must be frame numbers')
+
+    batch = get_addon()
+    steps, targets, object_names = load_pipeline(args)
+    if not steps and not parts:
+        parser.error('No step to run, use --pipeline or --actions')
+    for step in steps:
+        if step.get('action') not in batch.ACTIONS:
+            parser.error(f'Unknown action "{step.get("action")}", choose in {batch.ACTIONS}')
+
+    reports = []
+    for filepath in args.files:
+        output = None
+        if args.output_dir or args.output_suffix:
+            name, ext = os.path.splitext(os.path.basename(filepath))
+            folder = args.output_dir or os.path.dirname(os.path.abspath(filepath))
+            os.makedirs(folder, exist_ok=True)
+            output = os.path.join(folder, name + args.output_suffix + ext)
+        if parts:
+            report = merge_file(batch, os.path.abspath(filepath), parts, output=output, save=not args.no_save)
+            print(f'{filepath}: {sum(m["frames"] for m in report["merged"])} keyframes merged from {len(parts)} copies in {report["total"]:.3f}s')
+            reports.append(report)
+            continue
+        report = process_file(batch, os.path.abspath(filepath), steps, targets,
+            object_names=object_names, output=output, save=not args.no_save, frame_range=args.frame_range)
+        if report.get('error'):
+            print(f'{filepath}: FAILED, {report["error"]}')
+            reports.append(report)
+            continue
+        print(f'{filepath}: {len(report["steps"])} steps in {report["total"]:.3f}s')
+        for t in report['steps']:
+            print(f'  {t["object"]} > {t["action"]}: {t["time"]:.4f}s')
+        reports.append(report)
+
+    if args.report:
+        with open(args.report, 'w') as fd:
+            json.dump(reports, fd, indent=4)
+    return reports
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+'''
+Spread GP refine batch cleanup over multiple background blender processes
+
+Run with a regular python (not inside blender):
+    python batch_pool.py shots/*.blend --pipeline cleanup.json --jobs 16 --manifest manifest.json
+
+Each job launch `blender --background --python batch_cleanup.py` on one file.
+With --chunk, one long file is split in frame ranges jobs (--frame-range START END --chunk 100),
+each range job save its own copy suffixed with the range (e.g: shot_f0001-0100.blend).
+When all range jobs of a file are done, a merge job copy the processed keyframes of every range back in one file
+(saved as without --chunk: overwrite or in --output-dir) and the range copies are deleted (unless --keep-chunks).
+If a range job fail, the file is not merged and the copies are kept (partial results).
+
+Crashed or failing jobs are retried (--retries) and every job status is written in the manifest.
+Files that cannot be processed (error in batch_cleanup report, e.g: no camera for screen space actions) are not retried.
+'''
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'batch_cleanup.py')
+
+
+def build_jobs(files, frame_range=None, chunk=None):
+    '''Return list of job dict: one per file, or one per frame range chunk of each file'''
+    jobs = []
+    for filepath in files:
+        filepath = os.path.abspath(filepath)
+        if not frame_range or not chunk:
+            jobs.append({'file': filepath, 'frame_range': frame_range})
+            continue
+        start, end = frame_range
+        for chunk_start in range(start, end + 1, chunk):
+            jobs.append({'file': filepath, 'frame_range': [chunk_start, min(chunk_start + chunk - 1, end)]})
+    return jobs
+
+
+def build_merge_jobs(results):
+    '''Return one merge job per file whose frame range jobs are all done (other files are left unmerged)'''
+    chunks = {}
+    for job in results:
+        if job['frame_range'] and not job.get('merge'):
+            chunks.setdefault(job['file'], []).append(job)
+    jobs = []
+    for filepath, file_jobs in chunks.items():
+        if any(j['status'] != 'DONE' for j in file_jobs):
+            continue
+        parts = [[j['report'][0]['output'], *j['frame_range']] for j in sorted(file_jobs, key=lambda j: j['frame_range'][0])]
+        jobs.append({'file': filepath, 'frame_range': None, 'merge': parts})
+    return jobs
+
+
+def job_command(job, args, report_path):
+    if job.get('merge'):
+        cmd = [args.blender, '--background', '--factory-startup', '--python-exit-code', '1', '--python', SCRIPT, '--', job['file'], '--report', report_path]
+        for part, start, end in job['merge']:
+            cmd += ['--merge', part, str(start), str(end)]
+        if args.output_dir:
+            cmd += ['--output-dir', os.path.abspath(args.output_dir)]
+        return cmd
+
+    cmd = [args.blender, '--background', '--factory-startup', '--python-exit-code', '1', '--python', SCRIPT, '--', job['file'], '--report', report_path]
+    if args.pipeline:
+        cmd += ['--pipeline', os.path.abspath(args.pipeline)]
+    if args.actions:
+        cmd += ['--actions', *args.actions]
+    for key in ('layer', 'frame', 'stroke'):
+        if getattr(args, key):
+            cmd += [f'--{key}', getattr(args, key)]
+    if args.output_dir:
+        cmd += ['--output-dir', os.path.abspath(args.output_dir)]
+    if args.no_save:
+        cmd += ['--no-save']
+    if job['frame_range']:
+        start, end = job['frame_range']
+        cmd += ['--frame-range', str(start), str(end), '--output-suffix', f'_f{start:04d}-{end:04d}']
+    return cmd
+
+
+def run_job(job, args):
+    '''Run a job in a blender process, retry on failure, return job dict completed with status infos'''
+    job = dict(job, status='FAILED', attempts=0, returncode=None, report=None, error=None, log='')
+    start = time.perf_counter()
+    for attempt in range(1, args.retries + 2):
+        job['attempts'] = attempt
+        fd, report_path = tempfile.mkstemp(suffix='.json', prefix='gpr_batch_')
+        os.close(fd)
+        try:
+            proc = subprocess.run(job_command(job, args, report_path), capture_output=True, text=True, timeout=args.timeout)
+            job['returncode'] = proc.returncode
+            job['log'] = (proc.stdout + proc.stderr)[-2000:]# keep tail only
+            if proc.returncode == 0 and os.path.getsize(report_path):
+                with open(report_path, 'r') as f:
+                    job['report'] = json.load(f)
+                errors = [r['error'] for r in job['report'] if r.get('error')]
+                # file level errors (e.g: no camera) give the same result on retry
+                job['status'] = 'FAILED' if errors else 'DONE'
+                job['error'] = '; '.join(errors) or None
+                break
+        except subprocess.TimeoutExpired:
+            job['returncode'] = None
+            job['log'] = f'Timeout after {args.timeout}s'
+        except (OSError, ValueError) as e:
+            job['log'] = str(e)
+        finally:
+            if os.path.exists(report_path):
+                os.remove(report_path)
+    job['time'] = time.perf_counter() - start
+    return job
+
+
+def run_pool(jobs, args, results):
+    '''Run jobs on args.jobs blender processes, print and append each finished job to results'''
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        futures = [pool.submit(run_job, job, args) for job in jobs]
+        for done, future in enumerate(as_completed(futures), 1):
+            job = future.result()
+            results.append(job)
+            fr = f' {job["frame_range"]}' if job['frame_range'] else ''
+            kind = ' merge' if job.get('merge') else ''
+            print(f'[{done}/{len(jobs)}]{kind} {job["status"]} {os.path.basename(job["file"])}{fr} ({job["attempts"]} attempt, {job["time"]:.1f}s)')
+            if job['error']:
+                print(f'  {job["error"]}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run GP refine batch cleanup on many blend files with a pool of background blender')
+    parser.add_argument('files', nargs='+', help='Blend files to process')
+    parser.add_argument('--blender', default='blender', help='Blender executable (default: blender in PATH)')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help='Maximum number of blender processes at the same time')
+    parser.add_argument('--retries', type=int, default=1, help='Number of retry for crashed/failed jobs')
+    parser.add_argument('--timeout', type=float, default=None, help='Kill a job after this number of seconds')
+    parser.add_argument('--frame-range', nargs=2, type=int, metavar=('START', 'END'), help='Frame range to process')
+    parser.add_argument('--chunk', type=int, help='Split frame range in chunks of this size (one job per chunk, merged back in one file when all succeed)')
+    parser.add_argument('--keep-chunks', action='store_true', help='Keep frame range copies of chunk jobs after merge')
+    parser.add_argument('--manifest', default='gpr_batch_manifest.json', help='Json file receiving jobs results')
+    ## passed to batch_cleanup.py
+    parser.add_argument('--pipeline', help='Json file describing targets and steps')
+    parser.add_argument('--actions', nargs='*', help='Actions to apply (after pipeline steps)')
+    parser.add_argument('--layer', choices=('ALL', 'SELECT', 'ACTIVE', 'UNRESTRICTED'))
+    parser.add_argument('--frame', choices=('ACTIVE', 'ALL', 'SELECT'))
+    parser.add_argument('--stroke', choices=('SELECT', 'ALL', 'LAST'))
+    parser.add_argument('--output-dir', help='Save processed files in this folder instead of overwriting')
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args(argv)
+
+    if not args.pipeline and not args.actions:
+        parser.error('No step to run, use --pipeline or --actions')
+    if args.chunk and not args.frame_range:
+        parser.error('--chunk need a --frame-range')
+
+    jobs = build_jobs(args.files, frame_range=args.frame_range, chunk=args.chunk)
+    print(f'{len(jobs)} jobs on {min(args.jobs, len(jobs))} blender processes')
+
+    start = time.perf_counter()
+    results = []
+    run_pool(jobs, args, results)
+
+    if args.chunk and not args.no_save:
+        merge_jobs = build_merge_jobs(results)
+        unmerged = len({j['file'] for j in jobs}) - len(merge_jobs)
+        if unmerged:
+            print(f'{unmerged} files with failed chunks not merged, frame range copies are partial results')
+        if merge_jobs:
+            print(f'{len(merge_jobs)} merge jobs')
+            merge_results = []
+            run_pool(merge_jobs, args, merge_results)
+            results += merge_results
+            if not args.keep_chunks:
+                for job in merge_results:
+                    if job['status'] == 'DONE':
+                        for part, _start, _end in job['merge']:
+                            os.remove(part)
+
+    failed = [j for j in results if j['status'] != 'DONE']
+    manifest = {
+        'pipeline': args.pipeline,
+        'actions': args.actions,
+        'total_time': time.perf_counter() - start,
+        'done': len(results) - len(failed),
+        'failed': len(failed),
+        'jobs': results,
+        }
+    with open(args.manifest, 'w') as fd:
+        json.dump(manifest, fd, indent=4)
+
+    print(f'Done in {manifest["total_time"]:.1f}s, {len(failed)} failed. Manifest: {args.manifest}')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,102 @@
+import sys
+import types
+
+import numpy as np
+
+## Minimal stand-in of bpy / mathutils / bpy_extras modules for benchmarks outside of blender
+## Only what the timed gpfunc functions touch: bpy.context (set with set_context), Vector length and view3d projection
+## Installed only when the real modules are not importable (never shadow blender python)
+
+
+class Vector(np.ndarray):
+    '''numpy backed mathutils.Vector (arithmetic, length)'''
+
+    def __new__(cls, seq=(0.0, 0.0, 0.0)):
+        return np.asarray(seq, dtype=np.float64).view(cls)
+
+    @property
+    def length(self):
+        return float(np.linalg.norm(self))
+
+    def copy(self):
+        return Vector(self)
+
+
+class Matrix(np.ndarray):
+    '''numpy backed mathutils.Matrix'''
+
+    def __new__(cls, rows=np.identity(4)):
+        return np.asarray(rows, dtype=np.float64).view(cls)
+
+    def inverted(self):
+        return Matrix(np.linalg.inv(self))
+
+
+class Color(Vector):
+    pass
+
+
+def location_3d_to_region_2d(region, rv3d, coord):
+    '''bpy_extras.view3d_utils.location_3d_to_region_2d (None when behind the view)'''
+    co = rv3d.perspective_matrix @ np.append(np.asarray(coord, dtype=np.float64), 1.0)
+    if co[3] <= 0.0:
+        return
+    return Vector(((co[0] / co[3] + 1.0) * region.width / 2, (co[1] / co[3] + 1.0) * region.height / 2))
+
+
+def build_modules():
+    bpy = types.ModuleType('bpy')
+    bpy.context = None
+    bpy.types = types.ModuleType('bpy.types')
+    bpy.types.bpy_prop_array = type('bpy_prop_array', (), {})
+    bpy.app = types.ModuleType('bpy.app')
+    bpy.app.handlers = types.ModuleType('bpy.app.handlers')
+    bpy.app.handlers.persistent = lambda func: func
+
+    mathutils = types.ModuleType('mathutils')
+    mathutils.Vector = Vector
+    mathutils.Matrix = Matrix
+    mathutils.Color = Color
+    mathutils.geometry = types.ModuleType('mathutils.geometry')
+
+    bpy_extras = types.ModuleType('bpy_extras')
+    bpy_extras.view3d_utils = types.ModuleType('bpy_extras.view3d_utils')
+    bpy_extras.view3d_utils.location_3d_to_region_2d = location_3d_to_region_2d
+
+    return {
+        'bpy': bpy, 'bpy.types': bpy.types, 'bpy.app': bpy.app, 'bpy.app.handlers': bpy.app.handlers,
+        'mathutils': mathutils, 'mathutils.geometry': mathutils.geometry,
+        'bpy_extras': bpy_extras, 'bpy_extras.view3d_utils': bpy_extras.view3d_utils,
+        }
+
+
+def install():
+    '''Register stub modules in sys.modules if bpy is not available, return True when stubs are used'''
+    try:
+        import bpy
+        return False
+    except ImportError:
+        pass
+    for name, module in build_modules().items():
+        sys.modules.setdefault(name, module)
+    return True
+
+
+def set_context(ob, view, tool_settings=None):
+    '''
+    Set bpy.context to a 3D view context on given grease pencil object
+    view : (width, height, perspective_matrix, view_matrix, is_perspective) of the region
+    '''
+    region = types.SimpleNamespace(width=view.width, height=view.height)
+    rv3d = types.SimpleNamespace(perspective_matrix=Matrix(view.perspective_matrix),
+                                 view_matrix=Matrix(view.view_matrix), is_perspective=view.is_perspective)
+    context = types.SimpleNamespace(
+        object=ob,
+        mode='EDIT_GPENCIL',
+        region=region,
+        space_data=types.SimpleNamespace(region_3d=rv3d),
+        scene=types.SimpleNamespace(name='Scene', camera=None),
+        tool_settings=tool_settings or types.SimpleNamespace(use_gpencil_draw_onback=False),
+        )
+    sys.modules['bpy'].context = context
+    return context
@@ -0,0 +1,370 @@
+'''
+Benchmark of stroke processing hot paths on synthetic data (no blender needed)
+
+    python benchmarks/run_bench.py --scales 1000 10000 --points 50 --output bench.json
+
+Times the numpy buffers and kernels that the refine operators are built on
+(bulk attribute setters, lengths, straightening, tip thinning, projection, angle corners, auto join index,
+to circle casting, coplanarity, metadata index...) on generated strokes, and emits json timings and memory peaks.
+gpfunc functions called by the operators (to_straight_line, gp_polygonize, guess_join, straighten_strokes,
+thin_stroke_tips_percentage, is_coplanar_stroke, get_stroke_length, magnet_on_target, gp_set_attr, gp_add_attr)
+are timed end to end with bpy and mathutils stubbed (see bpy_stub).
+'''
+
+import io
+import os
+import sys
+import json
+import time
+import types
+import argparse
+import contextlib
+import platform
+import importlib
+import tracemalloc
+from collections import namedtuple
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+import synthetic
+import bpy_stub
+
+View = namedtuple('View', ['width', 'height', 'perspective_matrix', 'view_matrix', 'is_perspective'])
+
+
+def load_addon_modules(*names):
+    '''
+    Import modules of the addon without running addon __init__ (which needs blender)
+    an empty package is registered with the addon folder as path so relative imports still work
+    bpy and mathutils are stubbed when not available (modules using them like gpfunc can be loaded)
+    '''
+    bpy_stub.install()
+    pkg_name = 'gp_refine_bench'
+    if pkg_name not in sys.modules:
+        pkg = types.ModuleType(pkg_name)
+        pkg.__path__ = [os.path.dirname(BENCH_DIR)]
+        sys.modules[pkg_name] = pkg
+    return [importlib.import_module(f'{pkg_name}.{name}') for name in names]
+
+gp_buffer, gp_geometry, gp_cache, gp_index, gpfunc = load_addon_modules('gp_buffer', 'gp_geometry', 'gp_cache', 'gp_index', 'gpfunc')
+
+
+def measure(func, repeat=5, setup=None):
+    '''
+    Return min and mean time over repeat calls and memory peak of one call
+    setup : called before each call, not timed (e.g: restore strokes modified in place)
+    '''
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    if setup:
+        setup()
+    tracemalloc.start()
+    func()
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'time_min': min(times), 'time_mean': sum(times) / len(times), 'repeat': repeat, 'peak_mem': peak}
+
+
+def points_restore(strokes):
+    '''Return a setup function putting back current points of the strokes (for cases modifying them in place)'''
+    snapshot = [{attr: values.copy() for attr, values in s.points.data.items()} for s in strokes]
+    def setup():
+        for s, data in zip(strokes, snapshot):
+            s.points.data = {attr: values.copy() for attr, values in data.items()}
+    return setup
+
+
+## -- Cases : each get generated strokes and return a callable to time
+## or a (setup, callable) pair when the callable modify its inputs
+
+def case_buffer_fetch(strokes, view):
+    return lambda: gp_buffer.StrokeBuffer(strokes, ('co', 'pressure', 'strength'))
+
+def case_set_pressure(strokes, view):
+    def run():
+        buf = gp_buffer.StrokeBuffer(strokes, ('pressure',))
+        buf['pressure'] = 1.0
+        buf.write('pressure')
+    return run
+
+def case_add_strength(strokes, view):
+    def run():
+        buf = gp_buffer.StrokeBuffer(strokes, ('strength',))
+        buf['strength'] += 0.1
+        buf.write('strength')
+    return run
+
+def case_add_alpha(strokes, view):
+    def run():
+        buf = gp_buffer.StrokeBuffer(strokes, ('vertex_color',))
+        buf['vertex_color'][:, 3] += 0.1
+        buf.write('vertex_color')
+    return run
+
+def case_grade_colors(strokes, view):
+    def run():
+        buf = gp_buffer.StrokeBuffer(strokes, ('vertex_color',))
+        buf['vertex_color'] = gp_geometry.grade_colors(buf['vertex_color'], (1.0, 0.5, 0.2), mode='TINT', factor=0.3)
+        buf.write('vertex_color')
+    return run
+
+def case_stroke_lengths(strokes, view):
+    buf = gp_buffer.StrokeBuffer(strokes, ('co',))
+    return lambda: gp_geometry.stroke_lengths(buf['co'], buf.counts)
+
+def case_attribute_median(strokes, view):
+    '''attribute threshold selector core : per stroke median of pressure'''
+    buf = gp_buffer.StrokeBuffer(strokes, ('pressure',))
+    return lambda: gp_geometry.stroke_reduce(buf['pressure'], buf.counts, 'MEDIAN') < 0.45
+
+def case_straighten(strokes, view):
+    '''straighten_strokes core : all strokes straightened and pressure equalized in one pass'''
+    buf = gp_buffer.StrokeBuffer(strokes, ('co', 'pressure'))
+    ids = np.flatnonzero(buf.counts > 2)
+    def run():
+        co = gp_geometry.straighten_slices(buf['co'], buf.counts, ids, np.zeros_like(ids), buf.counts[ids] - 1, 0.8)
+        return co, gp_geometry.equalize_strokes(buf['pressure'], buf.counts, 0.8, mask=buf.counts > 2)
+    return run
+
+def case_thin_tips(strokes, view):
+    '''relative tip thinning core on all strokes in one pass (20% tips, seeded +/-10% variance per stroke)'''
+    buf = gp_buffer.StrokeBuffer(strokes, ('pressure',))
+    def run():
+        seeds = gp_geometry.hash_seeds(1, 2, 3, np.arange(len(buf)))
+        tip_len = np.clip(20 + gp_geometry.seeded_offsets(seeds, 10), 5, 100)
+        return gp_geometry.fade_stroke_tips(buf['pressure'], buf.counts, tip_len)
+    return run
+
+def case_projection(strokes, view):
+    buf = gp_buffer.StrokeBuffer(strokes, ('co',))
+    return lambda: gp_geometry.project_points(buf['co'], view.perspective_matrix, view.width, view.height)
+
+def case_projection_cache(strokes, view):
+    '''redo panel like re-execution : first call fill cache, next ones hit'''
+    buf = gp_buffer.StrokeBuffer(strokes, ('co',))
+    cache = gp_cache.ProjectionCache(max_bytes=1024**3)
+    def run():
+        return cache.get_projection(buf['co'], view, counts=buf.counts)
+    run()
+    return run
+
+def case_polygonize_corners(strokes, view):
+    '''corner detection of gp_polygonize with reduce (projection + point turns + run length encoded corners)'''
+    buf = gp_buffer.StrokeBuffer(strokes, ('co',))
+    def run():
+        co_2d = gp_geometry.project_points(buf['co'], view.perspective_matrix, view.width, view.height)
+        return gp_geometry.reduced_corner_pairs(gp_geometry.point_turn_angles(co_2d, buf.counts), buf.counts, 40)
+    return run
+
+def case_hatching(strokes, view):
+    '''hatching selector core on a whole frame (projection + turns + direction)'''
+    buf = gp_buffer.StrokeBuffer(strokes, ('co',))
+    def run():
+        co_2d = gp_geometry.project_points(buf['co'], view.perspective_matrix, view.width, view.height)
+        return gp_geometry.hatching_mask(co_2d, buf.counts, -45, 20, 12)
+    return run
+
+def case_join_search(strokes, view):
+    '''auto join proximity search : grid build over all points + head points queries'''
+    buf = gp_buffer.StrokeBuffer(strokes, ('co',))
+    co_2d = gp_geometry.project_points(buf['co'], view.perspective_matrix, view.width, view.height)
+    heads = co_2d[:7]
+    tol = 0.01
+    def run():
+        grid = gp_geometry.PointGrid(co_2d, max(gp_geometry.isclose_radius(h, tol) for h in heads))
+        found = []
+        for h in heads:
+            ids = grid.query_box(h, gp_geometry.isclose_radius(h, tol))
+            found.append(ids[gp_geometry.isclose_2d(co_2d[ids], h, tol)])
+        return found
+    return run
+
+def case_magnet_on_polyline(strokes, view):
+    '''to circle on all points against a 128 segments circle (magnet_on_target kernel)'''
+    buf = gp_buffer.StrokeBuffer(strokes, ('co',))
+    co_2d = gp_geometry.project_points(buf['co'], view.perspective_matrix, view.width, view.height)
+    theta = np.linspace(0, 2 * np.pi, 129)
+    circle = np.column_stack((np.cos(theta), np.sin(theta))) * 200 + co_2d.mean(axis=0)
+    return lambda: gp_geometry.magnet_on_polyline(co_2d, circle)
+
+def case_metadata_index(strokes, view):
+    '''full frame stroke metadata index build (fetch included)'''
+    return lambda: gp_index.StrokeIndex.from_strokes(strokes)
+
+def case_coplanar(strokes, view):
+    buf = gp_buffer.StrokeBuffer(strokes, ('co',))
+    return lambda: gp_geometry.stroke_planes(buf['co'], buf.counts)
+
+
+## -- gpfunc cases : real functions on a stubbed context (one layer, strokes in active frame)
+
+def case_to_straight_line(strokes, view):
+    '''straight line operator path : to_straight_line called on each stroke'''
+    def run():
+        for s in strokes:
+            gpfunc.to_straight_line(s, keep_points=True, influence=80)
+    return points_restore(strokes), run
+
+def case_straighten_strokes(strokes, view):
+    return points_restore(strokes), lambda: gpfunc.straighten_strokes(strokes, influence=80)
+
+def case_polygonize(strokes, view):
+    '''gp_polygonize called on each stroke (corners of one stroke per pass)'''
+    bpy_stub.set_context(synthetic.gpencil_object(strokes), view)
+    def run():
+        for s in strokes:
+            gpfunc.gp_polygonize(s, 40, influence=80)
+    restore = points_restore(strokes)
+    def setup():
+        restore()
+        gp_cache.projection_cache.clear()
+    return setup, run
+
+def case_polygonize_strokes(strokes, view):
+    '''polygonize operator path : corners of all strokes in one pass'''
+    bpy_stub.set_context(synthetic.gpencil_object(strokes), view)
+    restore = points_restore(strokes)
+    def setup():
+        restore()
+        gp_cache.projection_cache.clear()
+    return setup, lambda: gpfunc.gp_polygonize_strokes(strokes, 40, influence=80)
+
+def case_is_coplanar_stroke(strokes, view):
+    '''coplanarity check called on each stroke'''
+    def run():
+        return [gpfunc.is_coplanar_stroke(s) for s in strokes]
+    return run
+
+def case_get_stroke_length(strokes, view):
+    '''3D length called on each stroke'''
+    def run():
+        return [gpfunc.get_stroke_length(s) for s in strokes]
+    return run
+
+def case_magnet_on_target(strokes, view):
+    '''to circle transfer with Vector output : all points against a 128 segments circle'''
+    buf = gp_buffer.StrokeBuffer(strokes, ('co',))
+    co_2d = gp_geometry.project_points(buf['co'], view.perspective_matrix, view.width, view.height)
+    theta = np.linspace(0, 2 * np.pi, 129)
+    circle = np.column_stack((np.cos(theta), np.sin(theta))) * 200 + co_2d.mean(axis=0)
+    return lambda: gpfunc.magnet_on_target(co_2d, circle)
+
+def case_gp_set_attr(strokes, view):
+    '''set pressure operator path : target filters on the active frame'''
+    bpy_stub.set_context(synthetic.gpencil_object(strokes), view)
+    return lambda: gpfunc.gp_set_attr('pressure', 1.0, t_layer='ALL', t_frame='ACTIVE', t_stroke='ALL')
+
+def case_gp_add_attr(strokes, view):
+    '''add strength operator path : target filters on the active frame'''
+    bpy_stub.set_context(synthetic.gpencil_object(strokes), view)
+    return lambda: gpfunc.gp_add_attr('strength', -0.01, t_layer='ALL', t_frame='ACTIVE', t_stroke='ALL')
+
+def case_thin_tips_percentage(strokes, view):
+    '''thin tips operator path on all frames (frame batches, per stroke seeds) with 10 frames'''
+    bpy_stub.set_context(synthetic.gpencil_object(strokes, frames=10), view)
+    return lambda: gpfunc.thin_stroke_tips_percentage(tip_len=20, variance=10, t_layer='ALL', t_frame='ALL', t_stroke='ALL')
+
+def case_guess_join(strokes, view):
+    '''
+    join last stroke operator path : last stroke start on a point near the end of the first stroke
+    the frame is restored before each call (the join replace the two strokes by a new one)
+    '''
+    first = strokes[0].points.data['co']
+    start = int(len(first) * 0.8)
+    last = synthetic.FakeStroke(first[start] + np.linspace(0, 0.2, len(first))[:, None] * (1, 0, 0),
+                                material_index=strokes[0].material_index)
+    pool = strokes + [last]
+    ob = synthetic.gpencil_object(pool)
+    bpy_stub.set_context(ob, view)
+    frame = ob.data.layers.active.active_frame
+    def run():
+        frame.strokes[:] = pool
+        with contextlib.redirect_stdout(io.StringIO()):# found points count print
+            error = gpfunc.guess_join(same_material=True, proximity_tolerance=0.01, start_point_tolerance=6)
+        assert error is None, error
+    return run
+
+
+CASES = {
+'buffer_fetch': (case_buffer_fetch, synthetic.noisy_lines),
+'set_pressure': (case_set_pressure, synthetic.noisy_lines),
+'add_strength': (case_add_strength, synthetic.noisy_lines),
+'add_alpha': (case_add_alpha, synthetic.noisy_lines),
+'grade_colors': (case_grade_colors, synthetic.noisy_lines),
+'stroke_lengths': (case_stroke_lengths, synthetic.noisy_lines),
+'attribute_median': (case_attribute_median, synthetic.noisy_lines),
+'straighten': (case_straighten, synthetic.noisy_lines),
+'thin_tips': (case_thin_tips, synthetic.noisy_lines),
+'projection': (case_projection, synthetic.noisy_lines),
+'projection_cache': (case_projection_cache, synthetic.hatching),
+'polygonize_corners': (case_polygonize_corners, synthetic.polylines),
+'hatching': (case_hatching, synthetic.hatching),
+'join_search': (case_join_search, synthetic.noisy_lines),
+'magnet_on_polyline': (case_magnet_on_polyline, synthetic.circles),
+'coplanar': (case_coplanar, synthetic.noisy_lines),
+'metadata_index': (case_metadata_index, synthetic.noisy_lines),
+'to_straight_line': (case_to_straight_line, synthetic.noisy_lines),
+'straighten_strokes': (case_straighten_strokes, synthetic.noisy_lines),
+'polygonize': (case_polygonize, synthetic.polylines),
+'polygonize_strokes': (case_polygonize_strokes, synthetic.polylines),
+'is_coplanar_stroke': (case_is_coplanar_stroke, synthetic.circles),
+'get_stroke_length': (case_get_stroke_length, synthetic.noisy_lines),
+'magnet_on_target': (case_magnet_on_target, synthetic.circles),
+'gp_set_attr': (case_gp_set_attr, synthetic.noisy_lines),
+'gp_add_attr': (case_gp_add_attr, synthetic.noisy_lines),
+'thin_tips_percentage': (case_thin_tips_percentage, synthetic.noisy_lines),
+'guess_join': (case_guess_join, synthetic.noisy_lines),
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark GP refine strokes kernels on synthetic strokes')
+    parser.add_argument('--scales', nargs='+', type=int, default=[100, 1000, 10000], help='Number of strokes for each run')
+    parser.add_argument('--points', type=int, default=50, help='Points per stroke')
+    parser.add_argument('--noise', type=float, default=0.002, help='Coordinate noise of generated strokes')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--cases', nargs='+', choices=list(CASES), default=list(CASES))
+    parser.add_argument('--output', help='Json output file (default: print only)')
+    args = parser.parse_args(argv)
+
+    width, height, persp, view_mat = synthetic.perspective_view()
+    view = View(width, height, persp, view_mat, True)
+
+    results = []
+    for scale in args.scales:
+        for name in args.cases:
+            case, generator = CASES[name]
+            strokes = generator(strokes=scale, points=args.points, noise=args.noise, seed=args.seed)
+            run = case(strokes, view)
+            setup, run = run if isinstance(run, tuple) else (None, run)
+            res = measure(run, repeat=args.repeat, setup=setup)
+            res.update({'case': name, 'strokes': scale, 'points': sum(len(s.points) for s in strokes)})
+            results.append(res)
+            print(f'{name:<20} {scale:>7} strokes  min {res["time_min"]*1000:9.2f} ms  peak {res["peak_mem"]/1024**2:8.2f} MB')
+
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'points_per_stroke': args.points,
+            'seed': args.seed,
+            },
+        'results': results,
+        }
+    if args.output:
+        with open(args.output, 'w') as fd:
+            json.dump(report, fd, indent=4)
+    return report
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+import numpy as np
+
+## Synthetic grease pencil like data for benchmarks
+## Stand-in of strokes and points collections: bulk access (foreach_get/foreach_set)
+## and the per item access, add/pop/new/remove used by gpfunc (see bpy_stub for the context)
+
+POINT_ATTRS = {
+'co': 3,
+'pressure': 1,
+'strength': 1,
+'select': 1,
+'vertex_color': 4,
+'uv_factor': 1,
+'uv_rotation': 1,
+}
+
+
+class FakePoint:
+    '''Single point view on a FakePoints collection'''
+
+    __slots__ = ('_points', '_index')
+
+    def __init__(self, points, index):
+        object.__setattr__(self, '_points', points)
+        object.__setattr__(self, '_index', index)
+
+    def __getattr__(self, attr):
+        value = self._points.data[attr][self._index]
+        return value.copy() if POINT_ATTRS[attr] > 1 else value.item()
+
+    def __setattr__(self, attr, value):
+        self._points.data[attr][self._index] = value
+
+
+class FakePoints:
+    '''Points collection stand-in storing attributes as numpy arrays'''
+
+    def __init__(self, co, pressure=None, strength=None):
+        count = len(co)
+        self.data = {
+            'co': np.asarray(co, dtype=np.float32).reshape(-1, 3),
+            'pressure': np.ones(count, dtype=np.float32) if pressure is None else np.asarray(pressure, dtype=np.float32),
+            'strength': np.ones(count, dtype=np.float32) if strength is None else np.asarray(strength, dtype=np.float32),
+            'select': np.zeros(count, dtype=bool),
+            'vertex_color': np.zeros((count, 4), dtype=np.float32),
+            'uv_factor': np.zeros(count, dtype=np.float32),
+            'uv_rotation': np.zeros(count, dtype=np.float32),
+            }
+
+    def __len__(self):
+        return len(self.data['co'])
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('point index out of range')
+        return FakePoint(self, index)
+
+    def __iter__(self):
+        return (FakePoint(self, i) for i in range(len(self)))
+
+    def add(self, count=1):
+        for attr, values in self.data.items():
+            self.data[attr] = np.concatenate((values, np.zeros((count,) + values.shape[1:], dtype=values.dtype)))
+
+    def pop(self, index=-1):
+        index = self[index]._index
+        for attr, values in self.data.items():
+            self.data[attr] = np.delete(values, index, axis=0)
+
+    def foreach_get(self, attr, out):
+        out[...] = self.data[attr].reshape(-1)
+
+    def foreach_set(self, attr, values):
+        self.data[attr][...] = np.asarray(values).reshape(self.data[attr].shape)
+
+
+class FakeStroke:
+    def __init__(self, co, pressure=None, strength=None, material_index=0):
+        self.points = FakePoints(co, pressure=pressure, strength=strength)
+        self.select = False
+        self.line_width = 10
+        self.hardness = 1.0
+        self.material_index = material_index
+
+
+class FakeStrokes(list):
+    '''frame.strokes stand-in: stroke list with stroke level foreach, new and remove'''
+
+    def __init__(self, strokes=()):
+        super().__init__(strokes)
+        self.id_data = FakeGpencilData()
+
+    def foreach_get(self, attr, out):
+        out[...] = np.fromiter((getattr(s, attr) for s in self), dtype=out.dtype, count=len(self))
+
+    def foreach_set(self, attr, values):
+        for s, v in zip(self, np.asarray(values).tolist()):
+            setattr(s, attr, v)
+
+    def new(self):
+        stroke = FakeStroke(np.empty((0, 3)))
+        self.append(stroke)
+        return stroke
+
+
+class FakeFrame:
+    def __init__(self, strokes, frame_number=1):
+        self.strokes = FakeStrokes(strokes)
+        self.frame_number = frame_number
+        self.select = True
+
+
+class FakeLayer:
+    def __init__(self, frames, info='GP_Layer'):
+        self.frames = frames
+        self.active_frame = frames[0] if frames else None
+        self.info = info
+        self.select = True
+        self.hide = False
+        self.lock = False
+
+
+class FakeLayers(list):
+    def __init__(self, layers=()):
+        super().__init__(layers)
+        self.active = self[0] if self else None
+
+
+class FakeGpencilData:
+    def __init__(self, layers=()):
+        self.layers = FakeLayers(layers)
+
+    def update_tag(self):
+        pass
+
+
+class FakeObject:
+    def __init__(self, data, name='Stroke'):
+        self.type = 'GPENCIL'
+        self.name = name
+        self.data = data
+        self.matrix_world = np.identity(4)
+
+
+def gpencil_object(strokes, frames=1):
+    '''Grease pencil object with one layer, strokes split evenly over frames (first frame is active)'''
+    size = -(-len(strokes) // frames)
+    layer = FakeLayer([FakeFrame(strokes[i * size:(i + 1) * size], frame_number=i + 1) for i in range(frames)])
+    return FakeObject(FakeGpencilData([layer]))
+
+
+def noisy_lines(strokes=1000, points=50, noise=0.002, seed=0):
+    '''Random free lines (random walk)'''
+    rng = np.random.default_rng(seed)
+    result = []
+    for i in range(strokes):
+        start = rng.uniform(-1, 1, 3) * (1, 1, 0)
+        steps = rng.normal(0, 0.01, (points, 3)) * (1, 1, 0)
+        co = start + np.cumsum(steps, axis=0) + rng.normal(0, noise, (points, 3))
+        result.append(FakeStroke(co, pressure=rng.uniform(0.2, 1.0, points), material_index=i % 3))
+    return result
+
+def hatching(strokes=1000, points=20, angle=-45, noise=0.001, seed=0):
+    '''Short parallel straight lines at given angle (degree)'''
+    rng = np.random.default_rng(seed)
+    direction = np.array((np.cos(np.radians(angle)), np.sin(np.radians(angle)), 0.0))
+    t = np.linspace(0, 0.1, points)[:, None]
+    result = []
+    for _ in range(strokes):
+        start = rng.uniform(-1, 1, 3) * (1, 1, 0)
+        co = start + t * direction + rng.normal(0, noise, (points, 3)) * (1, 1, 0)
+        result.append(FakeStroke(co))
+    return result
+
+def circles(strokes=100, points=128, noise=0.01, seed=0):
+    '''Roughly circular strokes'''
+    rng = np.random.default_rng(seed)
+    theta = np.linspace(0, 2 * np.pi, points)
+    result = []
+    for _ in range(strokes):
+        center = rng.uniform(-1, 1, 3) * (1, 1, 0)
+        radius = rng.uniform(0.05, 0.3) * (1 + rng.normal(0, noise, points))
+        co = center + np.column_stack((np.cos(theta) * radius, np.sin(theta) * radius, np.zeros(points)))
+        result.append(FakeStroke(co))
+    return result
+
+def polylines(strokes=1000, points=60, corners=4, noise=0.001, seed=0):
+    '''Strokes made of straight parts separated by sharp corners (polygonize input)'''
+    rng = np.random.default_rng(seed)
+    result = []
+    for _ in range(strokes):
+        knots = rng.uniform(-1, 1, (corners + 1, 3)) * (1, 1, 0)
+        t = np.linspace(0, corners, points)
+        co = np.column_stack([np.interp(t, np.arange(corners + 1), knots[:, axis]) for axis in range(3)])
+        co += rng.normal(0, noise, co.shape) * (1, 1, 0)
+        result.append(FakeStroke(co))
+    return result
+
+def perspective_view(width=1920, height=1080, distance=5.0, fov=50.0):
+    '''Return (width, height, perspective_matrix, view_matrix) of a view looking down -Z axis'''
+    view = np.identity(4)
+    view[2, 3] = -distance
+    f = 1.0 / np.tan(np.radians(fov) / 2)
+    near, far = 0.1, 100.0
+    proj = np.array((
+        (f * height / width, 0, 0, 0),
+        (0, f, 0, 0),
+        (0, 0, (far + near) / (near - far), 2 * far * near / (near - far)),
+        (0, 0, -1, 0),
+        ))
+    return width, height, proj @ view, view
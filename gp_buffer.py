@@ -0,0 +1,167 @@
+import numpy as np
+
+## Bulk point buffers
+## Read and write point attributes of a whole stroke list with foreach_get/foreach_set
+## instead of accessing each point RNA property one at a time.
+
+# number of float per point for each attribute
+POINT_ATTR_SIZE = {
+'co': 3,
+'pressure': 1,
+'strength': 1,
+'select': 1,
+'vertex_color': 4,
+'uv_factor': 1,
+'uv_rotation': 1,
+}
+
+# hard limits of the RNA properties (foreach_set does not clamp values)
+POINT_ATTR_RANGE = {
+'pressure': (0.0, None),
+'strength': (0.0, 1.0),
+'vertex_color': (0.0, 1.0),
+'uv_factor': (0.0, None),
+}
+
+# hard limits of the stroke level RNA properties
+STROKE_ATTR_RANGE = {
+'line_width': (1, 1000),
+'hardness': (0.001, 1.0),
+}
+
+# integer RNA properties (foreach buffers must match property type)
+INT_ATTRS = ('line_width', 'material_index')
+
+# incremented on each point data write (selection excluded), cheap change marker for caches (see gp_index)
+write_version = 0
+
+def tag_write(attr):
+    global write_version
+    if attr != 'select':
+        write_version += 1
+
+def attr_dtype(attr):
+    if attr == 'select':
+        return bool
+    return np.int32 if attr in INT_ATTRS else np.float32
+
+
+class StrokeBuffer:
+    '''
+    Contiguous numpy arrays of point attributes for a list of strokes.
+    Points of all strokes are concatenated, offsets give the start of each stroke:
+    points of stroke i are in range offsets[i]:offsets[i+1]
+    '''
+
+    def __init__(self, strokes, attrs=('co',)):
+        self.strokes = list(strokes)
+        self.counts = np.fromiter((len(s.points) for s in self.strokes), dtype=np.int64, count=len(self.strokes))
+        self.offsets = np.zeros(len(self.strokes) + 1, dtype=np.int64)
+        np.cumsum(self.counts, out=self.offsets[1:])
+        self.data = {}
+        for attr in attrs:
+            self.fetch(attr)
+
+    def __len__(self):
+        return len(self.strokes)
+
+    def __getitem__(self, attr):
+        '''return attribute array shaped (points,) or (points, size), fetch it if needed'''
+        if attr not in self.data:
+            self.fetch(attr)
+        return self.data[attr]
+
+    def __setitem__(self, attr, value):
+        self[attr][...] = value
+
+    @property
+    def total(self):
+        '''total number of points in buffer'''
+        return int(self.offsets[-1])
+
+    @property
+    def stroke_index(self):
+        '''stroke index of each point'''
+        return np.repeat(np.arange(len(self.strokes)), self.counts)
+
+    def stroke_slice(self, i):
+        return slice(self.offsets[i], self.offsets[i+1])
+
+    def fetch(self, attr):
+        '''(Re)load attribute of all points from strokes'''
+        size = POINT_ATTR_SIZE.get(attr, 1)
+        flat = np.empty(self.total * size, dtype=attr_dtype(attr))
+        for s, start, end in zip(self.strokes, self.offsets[:-1], self.offsets[1:]):
+            if start == end:
+                continue
+            s.points.foreach_get(attr, flat[start*size:end*size])
+        self.data[attr] = flat.reshape(-1, size) if size > 1 else flat
+        return self.data[attr]
+
+    def write(self, attr, clamp=True, strokes=None):
+        '''
+        Write attribute back on strokes, one foreach_set per stroke
+        clamp : limit values to the RNA property range
+        strokes : optional iterable of stroke indexes to write (default all)
+        '''
+        tag_write(attr)
+        arr = self.data[attr]
+        if clamp and attr in POINT_ATTR_RANGE:
+            np.clip(arr, *POINT_ATTR_RANGE[attr], out=arr)
+        size = POINT_ATTR_SIZE.get(attr, 1)
+        flat = arr.reshape(-1)
+        indexes = range(len(self.strokes)) if strokes is None else strokes
+        for i in indexes:
+            start, end = self.offsets[i], self.offsets[i+1]
+            if start == end:
+                continue
+            self.strokes[i].points.foreach_set(attr, flat[start*size:end*size])
+
+
+def get_points_attr(points, attr='co'):
+    '''
+    Return attribute array of a points collection (foreach_get)
+    or of a plain list of points
+    '''
+    size = POINT_ATTR_SIZE.get(attr, 1)
+    if hasattr(points, 'foreach_get'):
+        flat = np.empty(len(points) * size, dtype=attr_dtype(attr))
+        points.foreach_get(attr, flat)
+        return flat.reshape(-1, size) if size > 1 else flat
+    return np.array([getattr(p, attr) for p in points], dtype=attr_dtype(attr)).reshape((-1, size) if size > 1 else -1)
+
+def set_points_attr(points, attr, values):
+    '''Set attribute array on a points collection (foreach_set) or on a plain list of points'''
+    tag_write(attr)
+    values = np.asarray(values, dtype=attr_dtype(attr))
+    if attr in POINT_ATTR_RANGE:
+        values = np.clip(values, *POINT_ATTR_RANGE[attr])
+    if hasattr(points, 'foreach_set'):
+        points.foreach_set(attr, values.reshape(-1))
+        return
+    for p, v in zip(points, values):
+        setattr(p, attr, v)
+
+
+def get_strokes_attr(strokes, attr='select'):
+    '''Return stroke level attribute array of a strokes collection (foreach_get) or of a plain list of strokes'''
+    dtype = attr_dtype(attr)
+    if hasattr(strokes, 'foreach_get'):
+        arr = np.empty(len(strokes), dtype=dtype)
+        strokes.foreach_get(attr, arr)
+        return arr
+    return np.fromiter((getattr(s, attr) for s in strokes), dtype=dtype, count=len(strokes))
+
+def set_strokes_attr(strokes, attr, values):
+    '''
+    Set stroke level attribute array on a strokes collection (foreach_set) or on a plain list of strokes
+    values are clamped to the RNA property range
+    '''
+    if attr in STROKE_ATTR_RANGE:
+        values = np.clip(values, *STROKE_ATTR_RANGE[attr])
+    values = np.asarray(values, dtype=attr_dtype(attr))
+    if hasattr(strokes, 'foreach_set'):
+        strokes.foreach_set(attr, values)
+        return
+    for s, v in zip(strokes, values.tolist()):
+        setattr(s, attr, v)
@@ -0,0 +1,100 @@
+import numpy as np
+from collections import OrderedDict, namedtuple
+from .gp_geometry import project_points, point_turn_angles
+
+## Projected coordinates cache
+## Redo panel re-execute selectors for each slider tick:
+## keep 2D projection and point turns of each stroke while view and stroke coordinates are unchanged.
+
+Projection = namedtuple('Projection', ['co_2d', 'point_turns'])
+
+
+class ProjectionCache:
+    '''
+    LRU cache of stroke projections, one entry per stroke
+    key : view matrix (+ object matrix) and stroke fingerprint (points count + coordinates hash)
+    max_bytes : memory cap of stored arrays, least recently used are evicted first
+    '''
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def clear(self):
+        self.entries.clear()
+        self.nbytes = 0
+        self.hits = self.misses = 0
+
+    @staticmethod
+    def view_key(view, matrix=None):
+        mat = np.asarray(view.perspective_matrix, dtype=np.float64)
+        if matrix is not None:
+            mat = mat @ np.asarray(matrix, dtype=np.float64)
+        return hash((view.width, view.height, mat.tobytes()))
+
+    @staticmethod
+    def stroke_key(co):
+        co = np.ascontiguousarray(co)
+        return (len(co), hash(co.tobytes()))
+
+    def get_projection(self, co, view, matrix=None, counts=None, view_key=None):
+        '''
+        Return Projection of (N,3) concatenated coordinates of strokes
+        counts : points count of each stroke (default: a single stroke), turns are not evaluated across strokes
+        Only strokes not cached are projected (in one pass), a changed stroke does not invalidate the others
+        view_key can be passed to avoid rehashing view for each call
+        '''
+        co = np.ascontiguousarray(co)
+        counts = np.asarray([len(co)] if counts is None else counts, dtype=np.int64)
+        if view_key is None:
+            view_key = self.view_key(view, matrix)
+        offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        bounds = offsets.tolist()
+        keys = [(view_key,) + self.stroke_key(co[a:b]) for a, b in zip(bounds[:-1], bounds[1:])]
+
+        entries = []
+        missing = []
+        for i, key in enumerate(keys):
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            else:
+                missing.append(i)
+            entries.append(entry)
+        self.hits += len(keys) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            sub_counts = counts[missing]
+            sub_offsets = np.cumsum(sub_counts) - sub_counts
+            ids = np.arange(sub_counts.sum()) + np.repeat(offsets[missing] - sub_offsets, sub_counts)
+            co_2d = project_points(co[ids], view.perspective_matrix, view.width, view.height, matrix=matrix)
+            turns = point_turn_angles(co_2d, sub_counts)
+            splits = sub_offsets[1:]
+            for i, stroke_2d, stroke_turns in zip(missing, np.split(co_2d, splits), np.split(turns, splits)):
+                entry = self.entries.get(keys[i])# same coordinates twice in the list
+                if entry is None:
+                    entry = Projection(stroke_2d, stroke_turns)
+                    self.entries[keys[i]] = entry
+                    self.nbytes += stroke_2d.nbytes + stroke_turns.nbytes
+                entries[i] = entry
+
+            while self.nbytes > self.max_bytes and len(self.entries) > 1:
+                _k, old = self.entries.popitem(last=False)
+                self.nbytes -= sum(a.nbytes for a in old)
+
+        if len(entries) == 1:
+            return entries[0]
+        if not entries:
+            return Projection(np.empty((0, 2)), np.empty(0))
+        return Projection(np.concatenate([e.co_2d for e in entries]), np.concatenate([e.point_turns for e in entries]))
+
+
+projection_cache = ProjectionCache()
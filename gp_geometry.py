@@ -0,0 +1,655 @@
+import numpy as np
+
+## Numpy geometry core
+## Stroke algorithms on plain arrays only (no bpy, no mathutils): usable on whole point buffers,
+## and outside blender (benchmarks, tests, cluster nodes).
+## gp_buffer is the adapter between these arrays and blender strokes (foreach_get/foreach_set).
+
+### -- Projection
+
+def project_points(coords, perspective_matrix, width, height, matrix=None):
+    '''
+    Batch equivalent of view3d_utils.location_3d_to_region_2d
+    coords : (N,3) array of 3D coordinates
+    perspective_matrix : (4,4) region (or camera) perspective matrix
+    width, height : region size in pixels
+    matrix : optional (4,4) matrix applied first (e.g: object matrix_world)
+    return (N,2) region coordinates, nan for points behind the view
+    '''
+    coords = np.asarray(coords, dtype=np.float64).reshape(-1, 3)
+    mat = np.asarray(perspective_matrix, dtype=np.float64)
+    if matrix is not None:
+        mat = mat @ np.asarray(matrix, dtype=np.float64)
+
+    prj = coords @ mat[:, :3].T + mat[:, 3]
+    w = prj[:, 3]
+    front = w > 0.0
+
+    half = np.array((width / 2, height / 2))
+    coords_2d = np.full((len(coords), 2), np.nan)
+    coords_2d[front] = half + half * (prj[front, :2] / w[front, None])
+    return coords_2d
+
+def unproject_points(coords_2d, depth_coords, perspective_matrix, view_matrix, is_perspective, width, height):
+    '''
+    Batch equivalent of view3d_utils.region_2d_to_location_3d
+    coords_2d : (N,2) region coordinates
+    depth_coords : (N,3) (or single (3,)) coordinates used as depth reference
+    return (N,3) coordinates
+    '''
+    coords_2d = np.asarray(coords_2d, dtype=np.float64).reshape(-1, 2)
+    depth = np.asarray(depth_coords, dtype=np.float64)
+    persinv = np.linalg.inv(np.asarray(perspective_matrix, dtype=np.float64))
+    viewinv = np.linalg.inv(np.asarray(view_matrix, dtype=np.float64))
+
+    dx = (2.0 * coords_2d[:, 0] / width) - 1.0
+    dy = (2.0 * coords_2d[:, 1] / height) - 1.0
+    view_axis = viewinv[:3, 2]
+
+    if is_perspective:
+        origin = viewinv[:3, 3]
+        out = np.column_stack((dx, dy, np.full(len(dx), -0.5)))
+        w = out @ persinv[3, :3] + persinv[3, 3]
+        direction = ((out @ persinv[:3, :3].T + persinv[:3, 3]) / w[:, None]) - origin
+        # intersect view rays with plane passing by depth coordinate facing the view
+        t = ((depth - origin) @ view_axis) / (direction @ view_axis)
+        return origin + direction * t[:, None]
+
+    origin = np.outer(dx, persinv[:3, 0]) + np.outer(dy, persinv[:3, 1]) + persinv[:3, 3]
+    direction = -view_axis / np.linalg.norm(view_axis)
+    # closest point of the depth coordinate on view rays
+    t = np.sum((depth - origin) * direction, axis=-1)
+    return origin + direction * t[:, None]
+
+
+### -- Angles
+
+def point_turn_angles(co_2d, counts):
+    '''
+    Signed turn (degree) at each point of a concatenated (N,2) buffer of strokes, same as get_angle(ab, bc)
+    only inner points are evaluated, nan on first and last point of each stroke
+    '''
+    co_2d = np.asarray(co_2d, dtype=np.float64)
+    counts = np.asarray(counts, dtype=np.int64)
+    angles = np.full(len(co_2d), np.nan)
+    inner = np.maximum(counts - 2, 0)
+    if not inner.any():
+        return angles
+    ## ids of inner points, segments never cross stroke boundaries
+    starts = np.cumsum(counts) - counts
+    ids = np.arange(inner.sum()) + np.repeat(starts + 1 - (np.cumsum(inner) - inner), inner)
+    ab = co_2d[ids] - co_2d[ids - 1]
+    bc = co_2d[ids + 1] - co_2d[ids]
+    cross = ab[:, 0] * bc[:, 1] - ab[:, 1] * bc[:, 0]
+    dot = np.sum(ab * bc, axis=1)
+    angles[ids] = np.degrees(np.arctan2(cross, dot))
+    return angles
+
+def stroke_max_turn(point_turns, counts, skip_last=0):
+    '''
+    Max absolute turn of each stroke from point_turn_angles
+    skip_last : number of inner points ignored at the end of strokes. 0 when no point is evaluated
+    '''
+    counts = np.asarray(counts, dtype=np.int64)
+    starts = np.cumsum(counts) - counts
+    res = np.zeros(len(counts))
+    valid = counts > 0
+    if not valid.any():
+        return res
+    pos = np.arange(len(point_turns)) - np.repeat(starts, counts)
+    evaluated = (pos >= 1) & (pos < np.repeat(counts - 1 - skip_last, counts))
+    values = np.where(evaluated, np.abs(point_turns), 0)
+    res[valid] = np.maximum.reduceat(values, starts[valid])
+    return res
+
+
+def ninety_angles(vectors):
+    '''
+    Angle of (N,2) region space vectors from horizon, folded in -90 (up) to 90 (down)
+    as utils.get_ninety_angle_from (nan for null vectors)
+    '''
+    vectors = np.asarray(vectors, dtype=np.float64)
+    angles = -np.degrees(np.arctan2(vectors[:, 1], vectors[:, 0]))
+    angles[angles > 90] -= 180
+    angles[angles < -90] += 180
+    angles[~np.any(vectors, axis=1)] = np.nan
+    return angles
+
+def stroke_ninety_angles(co_2d, counts):
+    '''
+    Screen direction angle of each stroke of a concatenated (N,2) buffer (see ninety_angles)
+    from first point to the point before last (to last with less than 4 points), nan with less than 2 points
+    '''
+    counts = np.asarray(counts, dtype=np.int64)
+    starts = np.cumsum(counts) - counts
+    angles = np.full(len(counts), np.nan)
+    valid = counts > 1
+    if valid.any():
+        ends = starts + counts - np.where(counts > 3, 2, 1)
+        angles[valid] = ninety_angles(co_2d[ends[valid]] - co_2d[starts[valid]])
+    return angles
+
+def hatching_mask(co_2d, counts, ref_angle, tolerance, deviation_tolerance):
+    '''
+    Strokes of a concatenated (N,2) buffer aligned on screen with ref_angle (+/- tolerance, see ninety_angles)
+    strokes with a turn above deviation_tolerance are skipped (last inner point ignored, often a comma)
+    '''
+    deviation = stroke_max_turn(point_turn_angles(co_2d, counts), counts, skip_last=1)
+    angles = stroke_ninety_angles(co_2d, counts)
+    with np.errstate(invalid='ignore'):
+        return (deviation <= deviation_tolerance) & (np.abs(angles - ref_angle) <= tolerance)
+
+
+
+### -- Spatial index
+
+def isclose_2d(coords, ref, rel_tol):
+    '''Vectorized utils.checkalign : mask of (N,2) coords close to ref on both axis (math.isclose rel_tol)'''
+    coords = np.asarray(coords, dtype=np.float64)
+    ref = np.asarray(ref, dtype=np.float64)
+    limit = rel_tol * np.maximum(np.abs(coords), np.abs(ref))
+    return np.all(np.abs(coords - ref) <= limit, axis=-1)
+
+def isclose_radius(ref, rel_tol):
+    '''Max offset on each axis that isclose_2d can accept around ref'''
+    return rel_tol * np.max(np.abs(ref)) / (1.0 - rel_tol)
+
+
+class PointGrid:
+    '''
+    Uniform grid over 2D points for fast box queries
+    Built once (sort of cell keys), each query only visit cells overlapping the box
+    nan coordinates (points behind view) are not indexed
+    '''
+
+    def __init__(self, co_2d, cell_size):
+        co_2d = np.asarray(co_2d, dtype=np.float64).reshape(-1, 2)
+        self.cell_size = max(float(cell_size), 1e-9)
+        ids = np.flatnonzero(~np.isnan(co_2d).any(axis=1))
+        keys = self._keys(np.floor(co_2d[ids] / self.cell_size).astype(np.int64))
+        order = np.argsort(keys, kind='stable')
+        self.ids = ids[order]
+        self.keys = keys[order]
+
+    @staticmethod
+    def _keys(cells):
+        return (cells[..., 0] << 32) + cells[..., 1]
+
+    def query_box(self, center, half_size):
+        '''Return indexes of points in cells overlapping the box center +/- half_size'''
+        low = np.floor((np.asarray(center) - half_size) / self.cell_size).astype(np.int64)
+        high = np.floor((np.asarray(center) + half_size) / self.cell_size).astype(np.int64)
+        found = []
+        for cx in range(low[0], high[0] + 1):
+            for cy in range(low[1], high[1] + 1):
+                key = (cx << 32) + cy
+                start = np.searchsorted(self.keys, key, side='left')
+                end = np.searchsorted(self.keys, key, side='right')
+                if start != end:
+                    found.append(self.ids[start:end])
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(found)
+
+
+### -- Shape casting
+
+def magnet_on_polyline(src, tgt, chunk_size=2048):
+    '''
+    Move each (N,2) src point to the closest position on the (M,2) tgt polyline
+    All points are evaluated against all segments at once by chunks of chunk_size points
+    (memory used is about chunk_size * M * 40 bytes)
+    Points that cannot be evaluated (nan) are left untouched
+    '''
+    src = np.asarray(src, dtype=np.float64).reshape(-1, 2)
+    tgt = np.asarray(tgt, dtype=np.float64).reshape(-1, 2)
+    out = src.copy()
+    if len(tgt) < 2:
+        return out
+
+    a = tgt[:-1]
+    ab = tgt[1:] - a
+    ab_len2 = np.sum(ab * ab, axis=1)
+    for start in range(0, len(src), chunk_size):
+        p = src[start:start + chunk_size]
+        ap = p[:, None, :] - a[None, :, :]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            t = np.sum(ap * ab, axis=2) / ab_len2
+        t = np.clip(np.nan_to_num(t, nan=0.0), 0.0, 1.0)# clamp on segment head/tail
+        pos = a + t[..., None] * ab
+        dist = np.sum((pos - p[:, None, :])**2, axis=2)
+        dist[np.isnan(dist)] = np.inf
+        best = np.argmin(dist, axis=1)
+        rows = np.arange(len(p))
+        valid = np.isfinite(dist[rows, best])
+        out[start:start + chunk_size][valid] = pos[rows, best][valid]
+    return out
+
+def project_on_circle(src, center, radius):
+    '''Move each (N,2) src point to the closest position on circle (analytic)'''
+    src = np.asarray(src, dtype=np.float64).reshape(-1, 2)
+    center = np.asarray(center, dtype=np.float64)
+    vec = src - center
+    length = np.linalg.norm(vec, axis=1)
+    # point exactly on center have no direction, send it on the right
+    vec[length == 0] = (1.0, 0.0)
+    length[length == 0] = 1.0
+    return center + vec * (radius / length)[:, None]
+
+
+### -- Planes
+
+def transform_points(co, matrix):
+    '''Apply (4,4) matrix to (N,3) coordinates'''
+    mat = np.asarray(matrix, dtype=np.float64)
+    return np.asarray(co, dtype=np.float64).reshape(-1, 3) @ mat[:3, :3].T + mat[:3, 3]
+
+def stroke_pca(co, counts):
+    '''
+    Principal axes of each stroke of a concatenated (N,3) buffer
+    return centers (S,3), eigen values (S,3) ascending and eigen vectors (S,3,3) as columns
+    (column 0: plane normal, column 2: principal direction). Strokes without points get nan
+    '''
+    co = np.asarray(co, dtype=np.float64).reshape(-1, 3)
+    counts = np.asarray(counts, dtype=np.int64)
+    nstrokes = len(counts)
+    centers = np.zeros((nstrokes, 3))
+    values = np.full((nstrokes, 3), np.nan)
+    vectors = np.full((nstrokes, 3, 3), np.nan)
+
+    valid = counts > 0
+    if not valid.any():
+        return centers, values, vectors
+    starts = (np.cumsum(counts) - counts)[valid]
+
+    centers[valid] = np.add.reduceat(co, starts, axis=0) / counts[valid, None]
+    local = co - np.repeat(centers, counts, axis=0)
+
+    # covariance of each stroke
+    cov = np.add.reduceat(local[:, :, None] * local[:, None, :], starts, axis=0)
+    values[valid], vectors[valid] = np.linalg.eigh(cov)
+    return centers, values, vectors
+
+def stroke_planes(co, counts):
+    '''
+    Least squares plane fit of each stroke of a concatenated (N,3) buffer
+    counts : (S,) number of points per stroke
+    return centers (S,3), normals (S,3) and max point distance to plane (S,)
+    '''
+    centers, _values, vectors = stroke_pca(co, counts)
+    # normal is the eigen vector of the smallest eigen value
+    normals = vectors[:, :, 0]
+    return centers, normals, plane_deviation(co, counts, centers, normals)
+
+def plane_deviation(co, counts, centers, normals):
+    '''Max distance of stroke points to the plane (center, normal) of their stroke'''
+    co = np.asarray(co, dtype=np.float64).reshape(-1, 3)
+    counts = np.asarray(counts, dtype=np.int64)
+    deviation = np.zeros(len(counts))
+    valid = counts > 0
+    if not valid.any():
+        return deviation
+    starts = (np.cumsum(counts) - counts)[valid]
+    local = co - np.repeat(centers, counts, axis=0)
+    dist = np.abs(np.sum(local * np.repeat(normals, counts, axis=0), axis=1))
+    deviation[valid] = np.maximum.reduceat(dist, starts)
+    return deviation
+
+def stroke_bounds(co, counts):
+    '''Bounding box min and max corners (S,dim) of each stroke of a concatenated buffer, nan for empty strokes'''
+    co = np.asarray(co, dtype=np.float64)
+    counts = np.asarray(counts, dtype=np.int64)
+    bmin = np.full((len(counts), co.shape[1]), np.nan)
+    bmax = bmin.copy()
+    valid = counts > 0
+    if valid.any():
+        starts = (np.cumsum(counts) - counts)[valid]
+        bmin[valid] = np.minimum.reduceat(co, starts, axis=0)
+        bmax[valid] = np.maximum.reduceat(co, starts, axis=0)
+    return bmin, bmax
+
+
+### -- Lengths
+
+def segment_lengths(co, counts):
+    '''
+    Length of the segment starting at each point of a concatenated (N,2|3) buffer
+    Last point of each stroke has no segment (0)
+    '''
+    co = np.asarray(co, dtype=np.float64)
+    counts = np.asarray(counts, dtype=np.int64)
+    seg = np.zeros(len(co))
+    if len(co) > 1:
+        seg[:-1] = np.linalg.norm(np.diff(co, axis=0), axis=1)
+    ends = np.cumsum(counts)[counts > 0]
+    seg[ends - 1] = 0.0# segments across strokes boundaries
+    return seg
+
+def stroke_lengths(co, counts):
+    '''Total length of each stroke of a concatenated (N,2|3) buffer'''
+    counts = np.asarray(counts, dtype=np.int64)
+    lengths = np.zeros(len(counts))
+    valid = counts > 0
+    if valid.any():
+        starts = (np.cumsum(counts) - counts)[valid]
+        lengths[valid] = np.add.reduceat(segment_lengths(co, counts), starts)
+    return lengths
+
+
+### -- Reductions
+
+def stroke_reduce(values, counts, method='MEAN'):
+    '''
+    Per stroke reduction of a concatenated point values buffer
+    method in MEAN, MEDIAN, MIN, MAX. Strokes without points get NaN
+    '''
+    values = np.asarray(values, dtype=np.float64)
+    counts = np.asarray(counts, dtype=np.int64)
+    res = np.full(len(counts), np.nan)
+    valid = counts > 0
+    if not valid.any():
+        return res
+    starts = (np.cumsum(counts) - counts)[valid]
+    if method == 'MEAN':
+        res[valid] = np.add.reduceat(values, starts) / counts[valid]
+    elif method == 'MIN':
+        res[valid] = np.minimum.reduceat(values, starts)
+    elif method == 'MAX':
+        res[valid] = np.maximum.reduceat(values, starts)
+    elif method == 'MEDIAN':
+        # sort values inside each stroke then average the one or two middle values
+        stroke_index = np.repeat(np.arange(len(counts)), counts)
+        ordered = values[np.lexsort((values, stroke_index))]
+        c = counts[valid]
+        res[valid] = (ordered[starts + (c - 1) // 2] + ordered[starts + c // 2]) / 2
+    else:
+        raise ValueError(f'Unknown reduction method {method}')
+    return res
+
+
+### -- Corners
+## One kernel for all strokes: turn angle of every point (point_turn_angles),
+## thresholded and run length encoded in chunks of consecutive points (point_runs)
+
+def point_runs(mask, counts):
+    '''
+    Run length encoding of True values of a concatenated per point mask, runs never cross strokes
+    return stroke index, start and end (excluded) point index in stroke of each run
+    '''
+    mask = np.asarray(mask, dtype=bool)
+    counts = np.asarray(counts, dtype=np.int64)
+    starts = np.cumsum(counts) - counts
+    first = np.zeros(len(mask), dtype=bool)
+    first[starts[counts > 0]] = True
+    last = np.zeros(len(mask), dtype=bool)
+    last[(starts + counts - 1)[counts > 0]] = True
+    prev = np.zeros(len(mask), dtype=bool)
+    prev[1:] = mask[:-1]
+    follow = np.zeros(len(mask), dtype=bool)
+    follow[:-1] = mask[1:]
+    begin = np.flatnonzero(mask & (first | ~prev))
+    stop = np.flatnonzero(mask & (last | ~follow)) + 1
+    stroke_index = np.repeat(np.arange(len(counts)), counts)[begin]
+    return stroke_index, begin - starts[stroke_index], stop - starts[stroke_index]
+
+def corner_mask(point_turns, tol, invert=False):
+    '''Inner points turning more than tol degree (less or equal if invert), stroke tips are never in'''
+    with np.errstate(invalid='ignore'):
+        return ((np.abs(point_turns) > tol) ^ invert) & ~np.isnan(point_turns)
+
+def closed_runs(runs, counts):
+    '''Keep runs ended by an inner point of their stroke (runs reaching the last evaluated point are dropped)'''
+    stroke_index, start, end = runs
+    closed = end < np.asarray(counts)[stroke_index] - 1
+    return stroke_index[closed], start[closed], end[closed]
+
+def run_peaks(values, counts, runs):
+    '''Point index in stroke of the first maximum value of each run'''
+    stroke_index, start, end = runs
+    if not len(start):
+        return start
+    lengths = end - start
+    run_offsets = np.cumsum(lengths) - lengths
+    local = np.arange(lengths.sum()) - np.repeat(run_offsets, lengths)
+    ids = np.repeat((np.cumsum(counts) - counts)[stroke_index] + start, lengths) + local
+    vals = values[ids]
+    is_max = vals == np.repeat(np.maximum.reduceat(vals, run_offsets), lengths)
+    first = np.flatnonzero(is_max)
+    run_of_max = np.repeat(np.arange(len(start)), lengths)[first]
+    _runs, first_ids = np.unique(run_of_max, return_index=True)
+    return start + local[first[first_ids]]
+
+def reduced_corners(point_turns, counts, tol):
+    '''
+    Sharpest point of each chunk of consecutive points turning more than tol (degree)
+    A chunk still open on the last evaluated point is ignored
+    return stroke index and point index in stroke of each corner
+    '''
+    runs = closed_runs(point_runs(corner_mask(point_turns, tol), counts), counts)
+    return runs[0], run_peaks(np.abs(point_turns), counts, runs)
+
+def split_by_stroke(stroke_index, values, nstrokes):
+    '''Group values (ordered by stroke) in one list per stroke'''
+    groups = [[] for _ in range(nstrokes)]
+    for i, value in zip(stroke_index.tolist(), values):
+        groups[i].append(value)
+    return groups
+
+def corner_pairs(keys, count):
+    '''Slices [start, end] between consecutive corner keys, from first point to count (None if less than 2 keys)'''
+    if len(keys) > 1:
+        keys = [0] + list(keys) + [count]
+        return [[keys[i], keys[i+1]] for i in range(len(keys)-1)]
+
+def reduced_corner_pairs(point_turns, counts, tol):
+    '''Polygonize slices between reduced corners for each stroke (None if less than 2 corners)'''
+    stroke_index, keys = reduced_corners(point_turns, counts, tol)
+    return [corner_pairs(k, c) for k, c in zip(split_by_stroke(stroke_index, keys.tolist(), len(counts)), np.asarray(counts).tolist())]
+
+def straight_chunk_pairs(point_turns, counts, tol, invert=False):
+    '''
+    Slices [start, end] of consecutive points turning less than tol (degree) for each stroke
+    a stroke get None if less than 2 points are under tolerance
+    '''
+    mask = corner_mask(point_turns, tol, invert=not invert)
+    counts = np.asarray(counts, dtype=np.int64)
+    added = np.bincount(np.repeat(np.arange(len(counts)), counts)[mask], minlength=len(counts))
+    stroke_index, start, end = closed_runs(point_runs(mask, counts), counts)
+    groups = split_by_stroke(stroke_index, np.column_stack((start, end)).tolist(), len(counts))
+    return [pairs if n > 1 else None for pairs, n in zip(groups, added.tolist())]
+
+
+### -- Straightening
+
+def straighten_slices(co, counts, stroke_index, start, end, influence=1.0):
+    '''
+    Return a copy of concatenated (N,3) co where inner points of every slice are moved on the straight
+    segment between slice ends, at the same ratio of the slice length (one pass for all slices)
+    stroke_index, start, end : (K,) arrays, slice ends are point index in stroke (end included, as a point)
+    influence : 0 to 1 interpolation from current position
+    slices of a stroke must not overlap (shared end points are fine)
+    '''
+    co = np.array(co, dtype=np.float64).reshape(-1, 3)
+    counts = np.asarray(counts, dtype=np.int64)
+    offsets = np.cumsum(counts) - counts
+    first = offsets[np.asarray(stroke_index, dtype=np.int64)] + np.asarray(start, dtype=np.int64)
+    last = offsets[np.asarray(stroke_index, dtype=np.int64)] + np.asarray(end, dtype=np.int64)
+    inner = last - first - 1
+    keep = inner > 0
+    first, last, inner = first[keep], last[keep], inner[keep]
+    if not len(first) or len(co) < 2:
+        return co
+
+    # distance from buffer start, only differences inside a slice are used (never cross strokes)
+    dist = np.zeros(len(co))
+    np.cumsum(np.linalg.norm(np.diff(co, axis=0), axis=1), out=dist[1:])
+    full = dist[last] - dist[first]
+
+    ids = np.repeat(first + 1, inner) + np.arange(inner.sum()) - np.repeat(np.cumsum(inner) - inner, inner)
+    first_rep = np.repeat(first, inner)
+    last_rep = np.repeat(last, inner)
+    full_rep = np.repeat(full, inner)
+    valid = full_rep > 0
+    ratio = (dist[ids] - dist[first_rep])[valid] / full_rep[valid]
+    ids, first_rep, last_rep = ids[valid], first_rep[valid], last_rep[valid]
+
+    targets = co[first_rep] + (co[last_rep] - co[first_rep]) * ratio[:, None]
+    co[ids] += (targets - co[ids]) * influence
+    return co
+
+def equalize_strokes(values, counts, influence=1.0, mask=None):
+    '''
+    Move values of each stroke of a concatenated buffer toward the stroke mean by influence (0 to 1)
+    mask : optional (S,) boolean, strokes to equalize
+    '''
+    values = np.array(values, dtype=np.float64)
+    counts = np.asarray(counts, dtype=np.int64)
+    means = stroke_reduce(values, counts, 'MEAN')
+    target = np.repeat(means, counts)
+    change = np.ones(len(values), dtype=bool) if mask is None else np.repeat(mask, counts)
+    values[change] += (target[change] - values[change]) * influence
+    return values
+
+
+### -- Tips
+
+FADE_CURVES = ('LINEAR', 'EASE', 'CUSTOM')
+
+def fade_curve(t, curve='LINEAR', curve_points=None):
+    '''
+    Map ramp t (0 on tip, 1 on body) with a falloff profile
+    LINEAR : straight fade, EASE : smoothstep (soft on tip and body)
+    CUSTOM : curve_points values evenly spaced from tip to body, linearly interpolated
+    '''
+    t = np.asarray(t, dtype=np.float64)
+    if curve == 'EASE':
+        return t * t * (3.0 - 2.0 * t)
+    if curve == 'CUSTOM' and curve_points is not None and len(curve_points) > 1:
+        return np.interp(t, np.linspace(0.0, 1.0, len(curve_points)), curve_points)
+    return t
+
+def fade_stroke_tips(values, counts, start_len, end_len=None, use_max=False, force_body=False,
+                     curve='LINEAR', curve_points=None, min_value=0.1):
+    '''
+    Fade values toward min_value on first and last points of all strokes of a concatenated buffer (linear ramp by default)
+    start_len, end_len : tip length in percentage of stroke points, scalar or (S,) per stroke
+    use_max : fade from stroke max value instead of the value right after the tip
+    force_body : set points out of tips to stroke max value (fade from it)
+    strokes with less than 4 points are unchanged
+    return (new values, (S,) mask of changed strokes)
+    '''
+    values = np.array(values, dtype=np.float64)
+    counts = np.asarray(counts, dtype=np.int64)
+    if end_len is None:
+        end_len = start_len
+    valid = counts >= 4
+    start_range = np.where(valid, np.floor(counts * np.asarray(start_len) / 100).astype(np.int64) + 1, 0)
+    end_range = np.where(valid, np.floor(counts * np.asarray(end_len) / 100).astype(np.int64) + 1, 0)
+    start_range = np.minimum(start_range, counts)
+    end_range = np.minimum(end_range, counts)
+    if not valid.any():
+        return values, valid
+
+    offsets = np.zeros(len(counts), dtype=np.int64)
+    np.cumsum(counts[:-1], out=offsets[1:])
+    stroke_index = np.repeat(np.arange(len(counts)), counts)
+    local = np.arange(len(values)) - offsets[stroke_index]
+    rev = counts[stroke_index] - 1 - local
+
+    if use_max or force_body:
+        start_max = end_max = stroke_reduce(values, counts, 'MAX')
+    else:
+        # one point further than the tip as reference (stable if relaunched)
+        ids = np.flatnonzero(valid)
+        start_max = np.zeros(len(counts))
+        end_max = np.zeros(len(counts))
+        start_max[ids] = values[offsets[ids] + np.minimum(start_range[ids] + 1, counts[ids] - 1)]
+        end_max[ids] = values[offsets[ids] + counts[ids] - np.minimum(end_range[ids] + 1, counts[ids] - 1)]
+
+    sr, er = start_range[stroke_index], end_range[stroke_index]
+    start = local < sr
+    end = rev < er
+    # when overlapping, the end ramp is kept on the first half (local <= rev) and the start ramp on the second half (as original loops)
+    use_end = end & ~(start & (local > rev))
+    use_start = start & ~use_end
+
+    if force_body:
+        body = valid[stroke_index] & ~(start | end)
+        values[body] = start_max[stroke_index[body]]
+
+    t = fade_curve(local[use_start] / sr[use_start], curve, curve_points)
+    top = start_max[stroke_index[use_start]]
+    values[use_start] = min_value + t * (top - min_value)
+
+    t = fade_curve(rev[use_end] / er[use_end], curve, curve_points)
+    top = end_max[stroke_index[use_end]]
+    values[use_end] = min_value + t * (top - min_value)
+    return values, valid
+
+
+### -- Vertex color
+
+COLOR_MODES = ('TINT', 'MULTIPLY', 'BLEND')
+
+def grade_colors(colors, color, mode='TINT', factor=1.0):
+    '''
+    Return (N,4) RGBA colors graded with an RGBA color
+    TINT : mix RGB toward color and raise alpha (vertex color mix) toward 1
+    MULTIPLY : multiply RGB by color, alpha kept
+    BLEND : mix RGBA toward color
+    factor : influence (0 no change, 1 full effect)
+    '''
+    colors = np.array(colors, dtype=np.float64).reshape(-1, 4)
+    color = np.asarray(color, dtype=np.float64)
+    if len(color) == 3:
+        color = np.append(color, 1.0)
+    if mode == 'TINT':
+        target = np.append(color[:3], 1.0)
+    elif mode == 'MULTIPLY':
+        target = colors.copy()
+        target[:, :3] *= color[:3]
+    elif mode == 'BLEND':
+        target = color
+    else:
+        raise ValueError(f'Unknown color mode "{mode}", choose in {COLOR_MODES}')
+    colors += (target - colors) * factor
+    return colors
+
+
+### -- Seeded variance
+
+def splitmix64(x):
+    '''splitmix64 finalizer on uint64 array (well spread bits for close inputs)'''
+    x = x + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+def hash_seeds(*keys):
+    '''
+    Mix integer keys (scalars or (N,) arrays) into (N,) uint64 seeds
+    Same keys give same seeds on every machine and run (no global random state)
+    '''
+    keys = [np.asarray(k).astype(np.uint64) for k in keys]
+    seeds = np.zeros(np.broadcast(*keys).shape, dtype=np.uint64)# np.broadcast_shapes needs numpy 1.20
+    with np.errstate(over='ignore'):
+        for k in keys:
+            seeds = splitmix64(seeds ^ k)
+    return seeds
+
+def seeded_offsets(seeds, variance):
+    '''Integer offset in range -variance, variance (included) for each seed'''
+    seeds = np.asarray(seeds, dtype=np.uint64)
+    if not variance:
+        return np.zeros(seeds.shape, dtype=np.int64)
+    return (seeds % np.uint64(2 * variance + 1)).astype(np.int64) - variance
+
+
+### -- Circle
+
+def fit_circle_2d(co_2d):
+    '''Average circle of 2D points : mean center and mean distance to center as radius'''
+    co_2d = np.asarray(co_2d, dtype=np.float64)
+    center = np.mean(co_2d, axis=0)# mean seem to have better placement than median for user
+    radius = np.mean(np.linalg.norm(co_2d - center, axis=1))
+    return center, radius
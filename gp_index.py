@@ -0,0 +1,102 @@
+from collections import OrderedDict
+from . import gp_buffer
+from .gp_buffer import StrokeBuffer
+from .gp_geometry import stroke_lengths, stroke_reduce, stroke_bounds, stroke_pca, plane_deviation
+
+## Stroke metadata index
+## Derived data of all strokes of a frame computed in one vectorized pass,
+## kept until frame strokes change so selectors only filter arrays.
+
+INDEX_ATTRS = ('co', 'pressure', 'strength')
+
+# geometry updates count per grease pencil datablock pointer (depsgraph handler registered in __init__)
+update_versions = {}
+
+def tag_depsgraph_update(depsgraph):
+    '''Count grease pencil geometry updates of a depsgraph (invalidate cached frame indexes of updated datablocks)'''
+    for update in depsgraph.updates:
+        if update.is_updated_geometry and update.id.bl_rna.identifier == 'GreasePencil':
+            pointer = update.id.original.as_pointer()
+            update_versions[pointer] = update_versions.get(pointer, 0) + 1
+
+
+class StrokeIndex:
+    '''
+    Per stroke metadata arrays (object space) of a stroke list, index i is stroke i
+    count, length, bounds_min/bounds_max (S,3),
+    pressure_mean/min/max, strength_mean/min/max,
+    center (S,3), direction (S,3) principal axis, normal (S,3), planarity (max distance to fitted plane)
+    '''
+
+    def __init__(self, buf, key=None):
+        co, counts = buf['co'], buf.counts
+        self.key = key
+        self.count = counts.copy()
+        self.length = stroke_lengths(co, counts)
+        self.bounds_min, self.bounds_max = stroke_bounds(co, counts)
+        for attr in ('pressure', 'strength'):
+            for method in ('mean', 'min', 'max'):
+                setattr(self, f'{attr}_{method}', stroke_reduce(buf[attr], counts, method.upper()))
+        self.center, _values, vectors = stroke_pca(co, counts)
+        self.direction = vectors[:, :, 2]
+        self.normal = vectors[:, :, 0]
+        self.planarity = plane_deviation(co, counts, self.center, self.normal)
+
+    def __len__(self):
+        return len(self.count)
+
+    @classmethod
+    def from_strokes(cls, strokes, key=None):
+        return cls(StrokeBuffer(strokes, INDEX_ATTRS), key=key)
+
+    def reduce(self, attr, method='MEAN'):
+        '''Stored per stroke reduction of a point attribute (None if not indexed, e.g: MEDIAN)'''
+        return getattr(self, f'{attr}_{method.lower()}', None)
+
+
+class FrameIndexCache:
+    '''
+    StrokeIndex of frames, keyed by frame pointer
+    An index is rebuilt when the frame key changed: stroke and point count, addon point writes (gp_buffer.write_version)
+    or geometry updates of the frame datablock (update_versions), checking it does not read any point attribute
+    max_frames : number of frames kept, least recently used are dropped first
+    '''
+
+    def __init__(self, max_frames=256):
+        self.max_frames = max_frames
+        self.entries = OrderedDict()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def clear(self):
+        self.entries.clear()
+
+    def invalidate(self, frame):
+        self.entries.pop(frame.as_pointer(), None)
+
+    @staticmethod
+    def frame_key(frame):
+        return (len(frame.strokes),
+                sum(len(s.points) for s in frame.strokes),
+                gp_buffer.write_version,
+                update_versions.get(frame.id_data.as_pointer(), 0))
+
+    def get_index(self, frame):
+        '''Return StrokeIndex of all strokes of the frame, computed only if frame content changed'''
+        pointer = frame.as_pointer()
+        key = self.frame_key(frame)
+        index = self.entries.get(pointer)
+        if index is not None and index.key == key:
+            self.entries.move_to_end(pointer)
+            return index
+
+        index = StrokeIndex.from_strokes(frame.strokes, key=key)
+        self.entries[pointer] = index
+        self.entries.move_to_end(pointer)
+        while len(self.entries) > self.max_frames:
+            self.entries.popitem(last=False)
+        return index
+
+
+frame_index_cache = FrameIndexCache()
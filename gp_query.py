@@ -0,0 +1,160 @@
+import re
+import ast
+import sys
+import numpy as np
+
+## Smart select query
+## Expression over stroke metadata compiled to numpy boolean masks (one pass for all conditions), e.g:
+##   length < 0.01 and mean(pressure) < 0.4 and angle ~ -45±20
+## Parsed with ast and evaluated on a restricted set of nodes (no python eval)
+
+FIELDS = {
+'length': '3D length',
+'points': 'Number of points',
+'size': 'Largest bounding box dimension',
+'planarity': 'Max distance of points to the stroke plane',
+'angle': 'Screen direction from -90 (up) to 90 (down), 0 is horizontal',
+'deviation': 'Max screen angle between consecutive segments (last point ignored)',
+'pressure': 'Mean points pressure (same as mean(pressure))',
+'strength': 'Mean points strength (same as mean(strength))',
+'line_width': 'Stroke line width',
+'hardness': 'Stroke hardness',
+'material': 'Material index',
+}
+
+# reductions of point attributes
+FUNCTIONS = ('mean', 'min', 'max')
+FUNCTION_ATTRS = ('pressure', 'strength')
+
+# `value ~ target±tolerance` (also accept +- and +/-)
+NEAR_RE = re.compile(r'([A-Za-z_]\w*(?:\(\s*\w+\s*\))?)\s*~\s*([-+]?\s*[\d.]+)\s*(?:±|\+/-|\+-)\s*([\d.]+)')
+
+COMPARE_OPS = {
+ast.Lt: np.less,
+ast.LtE: np.less_equal,
+ast.Gt: np.greater,
+ast.GtE: np.greater_equal,
+ast.Eq: np.equal,
+ast.NotEq: np.not_equal,
+}
+
+
+class QueryError(ValueError):
+    pass
+
+
+## python 3.7 (blender 2.80-2.82) parse numbers as ast.Num and has no ast.get_source_segment
+if sys.version_info < (3, 8):
+    def literal(node):
+        return node.n if isinstance(node, ast.Num) else None
+else:
+    def literal(node):
+        return node.value if isinstance(node, ast.Constant) else None
+
+def is_number(node):
+    '''node is an int or float literal'''
+    value = literal(node)
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def node_text(source, node):
+    '''source code of a node for error messages (node type name when not available)'''
+    if hasattr(ast, 'get_source_segment'):
+        return ast.get_source_segment(source, node) or type(node).__name__
+    return type(node).__name__
+
+
+def field_name(node):
+    '''metadata field name of a Name or a reduction Call node (e.g: mean(pressure) -> pressure_mean)'''
+    if isinstance(node, ast.Name):
+        if node.id not in FIELDS:
+            raise QueryError(f'Unknown field "{node.id}", choose in {", ".join(FIELDS)}')
+        if node.id in FUNCTION_ATTRS:
+            return f'{node.id}_mean'
+        return node.id
+
+    if isinstance(node.func, ast.Name) and node.func.id in FUNCTIONS:
+        if len(node.args) != 1 or not isinstance(node.args[0], ast.Name) or node.args[0].id not in FUNCTION_ATTRS:
+            raise QueryError(f'{node.func.id}() takes one of: {", ".join(FUNCTION_ATTRS)}')
+        return f'{node.args[0].id}_{node.func.id}'
+
+    raise QueryError(f'Unknown function, choose in {", ".join(FUNCTIONS)}')
+
+
+class Query:
+    '''
+    Compiled stroke query
+    fields : metadata fields used by the expression
+    call with a field getter (name -> (S,) array) and the number of strokes, return (S,) boolean mask
+    '''
+
+    def __init__(self, expression):
+        self.expression = expression
+        self.source = NEAR_RE.sub(r'near(\1, \2, \3)', expression.strip())
+        try:
+            self.tree = ast.parse(self.source, mode='eval').body
+        except SyntaxError as e:
+            raise QueryError(f'Invalid query: {e.msg}')
+        self.fields = set()
+        self.check(self.tree)
+
+    def check(self, node):
+        '''validate nodes and collect used fields'''
+        if isinstance(node, ast.BoolOp):
+            for value in node.values:
+                self.check(value)
+        elif isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.Not, ast.USub)):
+            self.check(node.operand)
+        elif isinstance(node, ast.Compare):
+            for op in node.ops:
+                if type(op) not in COMPARE_OPS:
+                    raise QueryError('Only <, <=, >, >=, ==, != comparisons are supported')
+            for value in (node.left, *node.comparators):
+                self.check(value)
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == 'near':
+            if len(node.args) != 3 or node.keywords:
+                raise QueryError('near() takes 3 arguments: near(value, target, tolerance)')
+            self.check(node.args[0])
+            for value in node.args[1:]:
+                if not (is_number(value) or isinstance(value, ast.UnaryOp)):
+                    raise QueryError('Use ~ with numbers: value ~ target±tolerance')
+                self.check(value)
+        elif isinstance(node, (ast.Name, ast.Call)):
+            self.fields.add(field_name(node))
+        elif is_number(node):
+            pass
+        else:
+            raise QueryError(f'Unsupported expression: {node_text(self.source, node)}')
+
+    def evaluate(self, node, get_field):
+        if isinstance(node, ast.BoolOp):
+            func = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+            result = self.evaluate(node.values[0], get_field)
+            for value in node.values[1:]:
+                result = func(result, self.evaluate(value, get_field))
+            return result
+        if isinstance(node, ast.UnaryOp):
+            value = self.evaluate(node.operand, get_field)
+            return np.logical_not(value) if isinstance(node.op, ast.Not) else -value
+        if isinstance(node, ast.Compare):
+            result = True
+            left = self.evaluate(node.left, get_field)
+            for op, comparator in zip(node.ops, node.comparators):
+                right = self.evaluate(comparator, get_field)
+                result = np.logical_and(result, COMPARE_OPS[type(op)](left, right))
+                left = right
+            return result
+        if isinstance(node, ast.Call) and node.func.id == 'near':
+            value, target, tolerance = (self.evaluate(a, get_field) for a in node.args)
+            diff = value - target
+            if isinstance(node.args[0], ast.Name) and node.args[0].id == 'angle':
+                # directions: -90 and 90 are the same
+                diff = (diff + 90) % 180 - 90
+            return np.abs(diff) <= tolerance
+        if is_number(node):
+            return literal(node)
+        return get_field(field_name(node))
+
+    def __call__(self, get_field, count):
+        with np.errstate(invalid='ignore'):# nan values (e.g: angle of single points) never match
+            mask = self.evaluate(self.tree, get_field)
+        return np.broadcast_to(np.asarray(mask, dtype=bool), (count,)).copy()
@@ -2,6 +2,10 @@ import bpy
 # from .utils import *
 from . import utils
 from . import gpfunc
+from . import gp_buffer
+from . import gp_index
+from . import gp_query
+from .gp_geometry import stroke_lengths, stroke_reduce, stroke_ninety_angles, point_turn_angles, stroke_max_turn, hatching_mask
 from mathutils import Vector, Matrix
 from math import radians, degrees, copysign, isclose
 import numpy as np
@@ -88,15 +92,14 @@ class GPREFINE_OT_select_by_length(Operator):
         # if not context.mode in ('EDIT_GPENCIL', 'SCULPT_GPENCIL'):# and pref.use_context:
         #     return {"CANCELLED"}#disable this one in Paint context
 
-        ## select stroke based on 3D length
+        ## select stroke based on 3D length (all lengths of the frame from one coordinate buffer)
         for l in context.object.data.layers:
-            if l.lock or l.hide:
+            if l.lock or l.hide or not l.active_frame:
                 continue
-            for s in l.active_frame.strokes:
-                if len(s.points) == 1:
-                    s.select = self.include_single_points
-                    continue
-                s.select = utils.get_stroke_length(s) <= self.length
+            buf = gp_buffer.StrokeBuffer(l.active_frame.strokes, ('co',))
+            select = stroke_lengths(buf['co'], buf.counts) <= self.length
+            select[buf.counts == 1] = self.include_single_points
+            l.active_frame.strokes.foreach_set('select', select)
 
         return {"FINISHED"}
     
@@ -163,53 +166,18 @@ def select_if_aligned_to_angle(s, ref_angle, tolerance, non_straight_tol):
     non_straight_tol (12) :: Tolerated deviation amount of each segments
     of the line compared to the next (skipping last)
     '''
-
-    count = len(s.points)
-    #if not s.select:
-    #    continue
-    if count < 2:
-        return
-
-    # check deviation
-    coords_2d = [utils.location_to_region(bpy.context.object.matrix_world @ p.co) for p in s.points]
-    
-    if count > 2:
-        #compare straight level only if at least 3 point
-        no_straight = False
-        #-2 to evaluate all pts, -3 to avoid last one (often with a coma angle)
-        for i in range(len(coords_2d)-3):
-            a = coords_2d[i]
-            b = coords_2d[i+1]
-            c = coords_2d[i+2]
-            deviation = abs(degrees((b-a).angle(c-b)))
-            #print('deviation:', deviation )
-            if deviation > non_straight_tol:
-                no_straight = True
-                break
-        if no_straight:
-            return
-        
-    # if not s.select:
-    #     return
-    
-    if count > 3:
-        ## on lines with at least four points. do not check the last point (often coma deviated)
-        angle = utils.get_ninety_angle_from(coords_2d[0], coords_2d[-2])
-    else:
-        angle = utils.get_ninety_angle_from(coords_2d[0], coords_2d[-1])
-    if not angle:
-        return
-    # if s.select:
-    #     print('>>', angle)
-
-    ## replace
-    # s.select = isclose(angle, ref_angle, abs_tol=tolerance)
-
-    # additive
-    if isclose(angle, ref_angle, abs_tol=tolerance):
-        #print(angle)
+    ## additive
+    if select_hatching([s], ref_angle, tolerance, non_straight_tol)[0]:
         s.select = True
 
+def select_hatching(strokes, ref_angle, tolerance, non_straight_tol, matrix=None):
+    '''Return hatching selection mask of strokes, all projected and evaluated at once'''
+    if matrix is None:
+        matrix = bpy.context.object.matrix_world
+    buf = gp_buffer.StrokeBuffer(strokes, ('co',))
+    co_2d = utils.location_to_region_batch(buf['co'], matrix=matrix)
+    return hatching_mask(co_2d, buf.counts, ref_angle, tolerance, non_straight_tol)
+
 
 class GPREFINE_OT_hatching_selector(Operator):
     bl_idname = "gp.hatching_selector"
@@ -236,8 +204,17 @@ class GPREFINE_OT_hatching_selector(Operator):
         # if context.mode == 'PAINT_GPENCIL' and pref.use_context:
         #     L, F, S = 'ACTIVE', 'ACTIVE', 'LAST'
 
-        for s in gpfunc.strokelist(t_layer=L, t_frame=F, t_stroke=S):
-            select_if_aligned_to_angle(s, self.ref_angle, self.tolerance, self.non_straight_tol)
+        ## evaluate frames by batch (one projection per batch), write selection per frame
+        matrix = context.object.matrix_world
+        for _layer, frames in gpfunc.frame_batches(t_layer=L, t_frame=F, t_stroke=S):
+            mask = select_hatching(gpfunc.batch_strokes(frames, t_stroke=S), self.ref_angle, self.tolerance, self.non_straight_tol, matrix=matrix)
+            start = 0
+            for f in frames:
+                end = start + len(f.strokes)
+                if end > start:
+                    # additive
+                    f.strokes.foreach_set('select', gp_buffer.get_strokes_attr(f.strokes, 'select') | mask[start:end])
+                start = end
 
         return {"FINISHED"}
     
@@ -266,11 +243,13 @@ class GPREFINE_OT_set_angle_from_stroke(Operator):
             L, F, S = 'ACTIVE', 'ACTIVE', 'LAST'
 
         ## use last selected stroke
-        slist = [s for s in gpfunc.strokelist(t_layer=L, t_frame=F, t_stroke=S) if s.select]
-        if not slist:
+        s = None
+        for stroke in gpfunc.iter_strokes(t_layer=L, t_frame=F, t_stroke=S):
+            if stroke.select:
+                s = stroke
+        if s is None:
             self.report({'ERROR'}, 'No selected stroke to evaluate')
             return {'CANCELLED'}
-        s = slist[-1]
         if len(s.points) < 2:
             self.report({'ERROR'}, 'Stroke have only one point')
             return {'CANCELLED'}
@@ -336,46 +315,58 @@ class GPREFINE_OT_backward_selector(Operator):
             self.report({'ERROR'}, self.frame)
             return {"CANCELLED"}
 
+        self.take_snapshot(context.object.data.layers.active.active_frame)
         return self.execute(context)
 
+    def take_snapshot(self, f):
+        '''Keep stroke selection as it was before the operator, redo only update it'''
+        self.snapshot = np.empty(len(f.strokes), dtype=bool)
+        f.strokes.foreach_get('select', self.snapshot)
+        self.state_key = None
+
+    def ordered_values(self, positions, endex):
+        '''Selection of strokes at given positions (in select order) for a slice ending at endex'''
+        values = self.snapshot[self.order[positions]]
+        values[(positions >= self.idx) & (positions < endex)] = not self.deselect
+        if self.replace_selection:
+            # skip the current stroke that we just treated and deselect all the other
+            values[positions > endex] = self.deselect
+        return values
+
     def execute(self, context):
-        ## prepare list and index
         f = context.object.data.layers.active.active_frame
+        if getattr(self, 'snapshot', None) is None or len(self.snapshot) != len(f.strokes):
+            self.take_snapshot(f)
+
+        state_key = (self.forward, self.deselect, self.replace_selection)
+        if state_key != self.state_key:
+            ## prepare order and index (only when options change)
+            self.count = len(self.snapshot)
+            self.order = np.arange(self.count) if self.forward else np.arange(self.count)[::-1]
+            # find first unselected stroke (selected when deselecting) and keep index
+            candidates = np.flatnonzero(self.snapshot[self.order] == self.deselect)
+            if not len(candidates):
+                self.report({'WARNING'}, 'Everything is already selected/deselected')
+                return {"CANCELLED"}
+            self.idx = int(candidates[0])
+            self.endex = None
 
-        self.strokelist = [s for s in f.strokes]
-        if not self.forward:
-            self.strokelist.reverse()
-        
-        self.count = len(self.strokelist)
-        # find first unselected stroke and keep index
-        self.idx = None
-        for i, s in enumerate(self.strokelist):
-            if not self.deselect and not s.select:
-                self.idx = i
-                break
-            if self.deselect and s.select:
-                self.idx = i
-                break
-        
-        if self.idx is None:
-            self.report({'WARNING'}, 'Everything is already selected/deselected')
-            return {"CANCELLED"}
-        
         ## --- evaluation
-        self.endex = self.idx+self.backward_select
-        if self.endex > self.count:
-            self.endex = self.count
-
-        for index in range(self.idx, self.endex):
-            # print(f'range {self.idx}-{self.endex} : index {index}')
-            self.strokelist[index].select = not self.deselect # True
-
-        if self.replace_selection:
-        # skip the current stroke the we just treated and deselect all the other
-            for index in range(self.endex+1, self.count):
-                # (if endex+1 >= count loop is not entered)
-                self.strokelist[index].select = self.deselect # False
+        endex = min(self.idx + self.backward_select, self.count)
 
+        if self.endex is None:
+            self.select_state = np.empty(self.count, dtype=bool)
+            positions = np.arange(self.count)
+        else:
+            # only strokes between previous and new slice end change
+            lo, hi = sorted((self.endex, endex))
+            positions = np.arange(lo, min(hi + 1, self.count))
+        self.select_state[self.order[positions]] = self.ordered_values(positions, endex)
+        self.endex = endex
+        self.state_key = state_key
+
+        # redo restore data before execute, write the whole state in one call
+        f.strokes.foreach_set('select', self.select_state)
         return {"FINISHED"}
 
     def draw(self, context):
@@ -417,18 +408,15 @@ class GPREFINE_OT_backward_stroke_delete(Operator):
         return self.execute(context)
 
     def execute(self, context):
-        ## prepare list and index
         f = context.object.data.layers.active.active_frame
-
-        strokelist = [s for s in f.strokes]
-        if not self.forward:
-            strokelist.reverse()
-        
-        self.count = len(strokelist)
-        
+        self.count = len(f.strokes)
         self.delete_to = self.backward_delete if self.backward_delete < self.count else self.count
-        for i, s in enumerate(strokelist[self.delete_to:0:-1]):
-            f.strokes.remove(s)
+
+        ## contiguous range from start (forward) or from end of the stack
+        if self.forward:
+            gpfunc.delete_stroke_range(f, 0, self.delete_to)
+        else:
+            gpfunc.delete_stroke_range(f, self.count - self.delete_to, self.count)
 
         return {"FINISHED"}
 
@@ -505,37 +493,27 @@ class GPREFINE_OT_attribute_selector(Operator):
         if self.use_target_filter:
             pref = context.scene.gprsettings
             L, F, S = pref.layer_tgt, pref.frame_tgt, pref.stroke_tgt
-            strokelist = gpfunc.strokelist(t_layer=L, t_frame=F, t_stroke=S)
+            batches = gpfunc.iter_stroke_batches(t_layer=L, t_frame=F, t_stroke=S)
         else:
-            strokelist = [s for s in f.strokes]
-
-        if self.on_points:
-            for s in strokelist:
-                for p in s.points:
-                    if self.replace_selection:
-                        p.select = (getattr(p, self.attribute) < self.attr_threshold) ^ self.greater
-                        continue
-                    if (getattr(p, self.attribute) < self.attr_threshold) ^ self.greater:
-                        p.select = True
-            return {"FINISHED"}
-
-        if self.method == 'MEAN': # average
-            comp_func = np.mean
-        elif self.method == 'MEDIAN':
-            comp_func = np.median
-        elif self.method == 'MIN':
-            comp_func = np.min
-        elif self.method == 'MAX':
-            comp_func = np.max
-
-        for s in strokelist:
-            stroke_pressure = comp_func([getattr(p, self.attribute) for p in s.points])
-            if self.replace_selection:
-                s.select = (stroke_pressure < self.attr_threshold) ^ self.greater
+            batches = [f.strokes]
+
+        for strokes in batches:
+            ## attribute of all points of the batch fetched at once (on first access), compared in bulk
+            buf = gp_buffer.StrokeBuffer(strokes, ())
+
+            if self.on_points:
+                select = (buf[self.attribute] < self.attr_threshold) ^ self.greater
+                if not self.replace_selection:
+                    select |= buf['select']
+                buf['select'] = select
+                buf.write('select')
                 continue
 
-            if (stroke_pressure < self.attr_threshold) ^ self.greater:
-                s.select = True
+            values = stroke_reduce(buf[self.attribute], buf.counts, self.method)
+            select = (values < self.attr_threshold) ^ self.greater
+            if not self.replace_selection:
+                select |= gp_buffer.get_strokes_attr(strokes, 'select')
+            gp_buffer.set_strokes_attr(strokes, 'select', select)
 
         return {"FINISHED"}
 
@@ -584,7 +562,7 @@ class GPREFINE_OT_attribute_selector(Operator):
 class GPREFINE_OT_coplanar_selector(Operator):
     bl_idname = "gp.coplanar_selector"
     bl_label = "Coplanar Selector"
-    bl_description = "Select Non coplanar strokes (On active frame)\nYou can invert in redo panel"
+    bl_description = "Select Non coplanar strokes (On active frame)\nYou can invert or use the stroke targets filter in redo panel"
     bl_options = {"REGISTER", "UNDO"}
     
     invert : bpy.props.BoolProperty(name="Invert", default=False,
@@ -597,6 +575,10 @@ class GPREFINE_OT_coplanar_selector(Operator):
     verbose : bpy.props.BoolProperty(name="Verbose", default=False,
         description='Print information in console')
 
+    use_target_filter: bpy.props.BoolProperty(
+        name="Use Stroke Targets Filter", default=False,
+        description='Use GP refine stroke dedicated filter (layer > frame > stroke)\nElse use only active frame of active layer')
+
     @classmethod
     def poll(cls, context):
         return context.object and context.object.type == 'GPENCIL'
@@ -611,15 +593,28 @@ class GPREFINE_OT_coplanar_selector(Operator):
 
     def execute(self, context):
 
-        strokes = context.object.data.layers.active.active_frame.strokes
-        self.count = len(strokes)
+        if self.use_target_filter:
+            pref = context.scene.gprsettings
+            L, F, S = pref.layer_tgt, pref.frame_tgt, pref.stroke_tgt
+            batches = gpfunc.iter_stroke_batches(t_layer=L, t_frame=F, t_stroke=S)
+        else:
+            batches = [context.object.data.layers.active.active_frame.strokes]
+        self.count = 0
         self.ct = 0
         self.problem = 0
-        for s in strokes:
-            is_coplanar = gpfunc.is_coplanar_stroke(s, tol=self.tolerance, verbose=self.verbose)
-            s.select = is_coplanar ^ self.invert
-            if s.select:
-                self.ct +=1
+        non_coplanar = 0
+
+        for strokes in batches:
+            ## all strokes planes of the batch are fitted at once
+            coplanar, _normals = gpfunc.get_coplanar_strokes(strokes, tol=self.tolerance)
+            select = coplanar ^ self.invert
+            gp_buffer.set_strokes_attr(strokes, 'select', select)
+            self.count += len(strokes)
+            self.ct += int(np.count_nonzero(select))
+            non_coplanar += int(np.count_nonzero(~coplanar))
+
+        if self.verbose:
+            print(f'{non_coplanar}/{self.count} non-coplanar strokes')
 
         return {"FINISHED"}
 
@@ -629,9 +624,106 @@ class GPREFINE_OT_coplanar_selector(Operator):
         layout.label(text=f'{self.ct} {target} selected (/{self.count})')
         layout.prop(self, "invert")
         layout.prop(self, "tolerance")
+        layout.prop(self, "use_target_filter")
         # layout.prop(self, "verbose")
 
 
+## --- smart select
+
+def query_field_getter(frame, index, matrix):
+    '''Return a getter of frame strokes metadata fields (name -> per stroke array), computed on first access only'''
+    fields = {}
+    def get_field(name):
+        if name not in fields:
+            if name == 'points':
+                fields[name] = index.count
+            elif name == 'size':
+                fields[name] = np.max(index.bounds_max - index.bounds_min, axis=1)
+            elif name in ('angle', 'deviation'):
+                buf = gp_buffer.StrokeBuffer(frame.strokes, ('co',))
+                co_2d = utils.location_to_region_batch(buf['co'], matrix=matrix)
+                fields['angle'] = stroke_ninety_angles(co_2d, buf.counts)
+                fields['deviation'] = stroke_max_turn(point_turn_angles(co_2d, buf.counts), buf.counts, skip_last=1)
+            elif name in ('line_width', 'hardness'):
+                fields[name] = gp_buffer.get_strokes_attr(frame.strokes, name)
+            elif name == 'material':
+                fields[name] = gp_buffer.get_strokes_attr(frame.strokes, 'material_index')
+            else:
+                fields[name] = getattr(index, name)
+        return fields[name]
+    return get_field
+
+
+class GPREFINE_OT_smart_select(Operator):
+    bl_idname = "gp.smart_select"
+    bl_label = "Smart Select"
+    bl_description = "Select strokes matching a query on strokes metadata (On active frame)\n\
+e.g: length < 0.01 and mean(pressure) < 0.4 and angle ~ -45±20\nTweak query in redo panel"
+    bl_options = {"REGISTER", "UNDO"}
+
+    query : bpy.props.StringProperty(name="Query", default='length < 0.01',
+        description='Conditions on strokes, combined with and / or / not\n\
+Fields: ' + ', '.join(gp_query.FIELDS) + '\n\
+Functions: mean(), min(), max() of pressure or strength\n\
+Comparisons: < <= > >= == != and ~ for a range (angle ~ -45±20)')
+
+    replace_selection: bpy.props.BoolProperty(
+        name="Replace Selection", default=True,
+        description='Replace instead of additive selection')
+
+    use_target_filter: bpy.props.BoolProperty(
+        name="Use Layer/Frame Targets Filter", default=False,
+        description='Use GP refine layer > frame targets filter (all strokes of targeted frames)\nElse use only active frame of active layer')
+
+    @classmethod
+    def poll(cls, context):
+        return context.object and context.object.type == 'GPENCIL'
+
+    def invoke(self, context, event):
+        self.frame = active_frame_validity_check(context)
+        if isinstance(self.frame, str):
+            self.report({'ERROR'}, self.frame)
+            return {"CANCELLED"}
+
+        return self.execute(context)
+
+    def execute(self, context):
+        self.ct = self.count = 0
+        try:
+            query = gp_query.Query(self.query)
+        except gp_query.QueryError as e:
+            self.report({'ERROR'}, str(e))
+            return {"CANCELLED"}
+
+        if self.use_target_filter:
+            pref = context.scene.gprsettings
+            frames = (f for _l, f in gpfunc.iter_frames(t_layer=pref.layer_tgt, t_frame=pref.frame_tgt))
+        else:
+            frames = [context.object.data.layers.active.active_frame]
+
+        matrix = context.object.matrix_world
+        for f in frames:
+            if not len(f.strokes):
+                continue
+            ## all conditions evaluated on the frame metadata arrays
+            index = gp_index.frame_index_cache.get_index(f)
+            select = query(query_field_getter(f, index, matrix), len(index))
+            if not self.replace_selection:
+                select |= gp_buffer.get_strokes_attr(f.strokes, 'select')
+            f.strokes.foreach_set('select', select)
+            self.ct += int(np.count_nonzero(select))
+            self.count += len(index)
+
+        return {"FINISHED"}
+
+    def draw(self, context):
+        layout = self.layout
+        layout.prop(self, "query", text='')
+        layout.label(text=f'{self.ct} selected (/{self.count})')
+        layout.prop(self, "use_target_filter")
+        layout.prop(self, "replace_selection")
+
+
 classes = (
     GPREFINE_OT_select_by_angle,
     GPREFINE_OT_select_by_length,
@@ -641,6 +733,7 @@ classes = (
     GPREFINE_OT_set_angle_from_stroke,
     GPREFINE_OT_attribute_selector,
     GPREFINE_OT_coplanar_selector,
+    GPREFINE_OT_smart_select,
 )
 
 
@@ -1,10 +1,16 @@
 from .utils import *
+from .gp_buffer import StrokeBuffer, get_points_attr, set_points_attr, get_strokes_attr, set_strokes_attr
+from .gp_cache import projection_cache
+from .gp_geometry import (PointGrid, isclose_2d, isclose_radius, magnet_on_polyline, project_on_circle, transform_points,
+    stroke_planes, stroke_lengths, corner_mask, reduced_corners, reduced_corner_pairs, straight_chunk_pairs,
+    straighten_slices, equalize_strokes, fade_stroke_tips, grade_colors, hash_seeds, seeded_offsets, fit_circle_2d)
 import bpy
 import mathutils
 from mathutils import Vector
 from math import acos, degrees
 from mathutils import geometry
 import numpy as np
+import zlib
 
 ### -- GET STROKES FILTERS --
 
@@ -14,26 +20,29 @@ def get_layers(target='SELECT'):
     SELECT (default), ACTIVE, ALL, SIDE_SELECT, UNRESTRICTED
     Return empty list if nothing found
     '''
-    if not bpy.context.object.type == 'GPENCIL': return []
-    if not bpy.context.object.data.layers.active: return []
+    ob = bpy.context.object
+    if not ob.type == 'GPENCIL': return []
+    layers = ob.data.layers
+    active = layers.active # resolved once
+    if not active: return []
     
     if not target or target == 'SELECT':# iterable with all selected layer (dopesheet)
-        # return [l for l in bpy.context.object.data.layers if l.select and not l.hide and not l.lock]
         ## seems it can sometimes bug when there is an active that is not selected (should be selected) 
-        return [l for l in bpy.context.object.data.layers if l ==  bpy.context.object.data.layers.active and not l.hide and not l.lock or l.select and not l.hide and not l.lock]
+        return [l for l in layers if (l.select or l == active) and not l.hide and not l.lock]
 
     elif target == 'ACTIVE':# iterable with only active layer
-        return [bpy.context.object.data.layers.active]
+        return [active]
 
     elif target == 'ALL': # all visible and unlocked layers iterable
-        return [l for l in bpy.context.object.data.layers if not l.hide and not l.lock]
+        return [l for l in layers if not l.hide and not l.lock]
 
     elif target == 'SIDE_SELECT':# iterable with all selected layer except active
-        if bpy.context.object.data.layers.active and len([l for l in bpy.context.object.data.layers if l.select and not l.hide and not l.lock]) > 1:
-            return [l for l in bpy.context.object.data.layers if l.select and not l.hide and not l.lock and l != bpy.context.object.data.layers.active]
+        selected = [l for l in layers if l.select and not l.hide and not l.lock]
+        if len(selected) > 1:
+            return [l for l in selected if l != active]
     
     elif target == 'UNRESTRICTED': # all layers iterable (everything)
-        return bpy.context.object.data.layers
+        return layers
 
     return []
 
@@ -65,7 +74,10 @@ def get_strokes(frame, target='SELECT'):
     if not len(frame.strokes):return []
     
     if not target or target == 'SELECT':
-        return  [s for s in frame.strokes if s.select]
+        # one pass on the collection (index access walk the stroke list)
+        select = np.empty(len(frame.strokes), dtype=bool)
+        frame.strokes.foreach_get('select', select)
+        return [s for s, sel in zip(frame.strokes, select.tolist()) if sel]
     
     elif target == 'ALL':
         return frame.strokes
@@ -76,28 +88,111 @@ def get_strokes(frame, target='SELECT'):
     
     return []  
 
+## Lazy traversal (generators): strokes are yielded frame by frame, nothing is built up front
+
+def iter_frames(t_layer='ALL', t_frame='ACTIVE'):
+    '''Yield (layer, frame) of target frames'''
+    for l in get_layers(target=t_layer):
+        for f in get_frames(l, target=t_frame):
+            yield l, f
+
+def iter_stroke_ids(t_layer='ALL', t_frame='ACTIVE', t_stroke='SELECT'):
+    '''Yield (layer, frame, stroke index) of target strokes (index in frame.strokes)'''
+    for l, f in iter_frames(t_layer=t_layer, t_frame=t_frame):
+        for i in get_stroke_indexes(f, target=t_stroke).tolist():
+            yield l, f, i
+
+def iter_strokes(t_layer='ALL', t_frame='ACTIVE', t_stroke='SELECT'):
+    '''Yield target strokes one by one'''
+    for _l, f in iter_frames(t_layer=t_layer, t_frame=t_frame):
+        yield from get_strokes(f, target=t_stroke)
+
+def iter_stroke_batches(t_layer='ALL', t_frame='ACTIVE', t_stroke='SELECT', strokes=None):
+    '''
+    Yield target strokes as lists, one per frame batch (see frame_batches)
+    strokes : explicit stroke list yielded as a single batch instead of filters
+    '''
+    if strokes is not None:
+        yield strokes
+        return
+    for _l, frames in frame_batches(t_layer=t_layer, t_frame=t_frame, t_stroke=t_stroke):
+        batch = batch_strokes(frames, t_stroke=t_stroke)
+        if batch:
+            yield batch
+
 def strokelist(t_layer='ALL', t_frame='ACTIVE', t_stroke='SELECT'):
     '''
     Quickly return a strokelist according to given filters
     By default - All accessible on viewport : visible and unlocked
+    Prefer iter_strokes or iter_stroke_batches when a list is not needed
     '''
     ## TODO: when stroke is LAST and layer is ALL it can be the last of all layers, priority must be set to active layer.
-    
-    # superBAD - WRONG: (not flattened) : [[[s for s in get_strokes(f, target=t_stroke)] for f in get_frames(l, target=t_frame)] for l in get_layers(target=t_layer)][0][0]
-
-    # itertool not tested enough, flatenned twice like this need speed tests...
-    """ import itertools# un-nesting triple comprehension list
-    turbolist = [[[s for s in get_strokes(f, target=t_stroke)] for f in get_frames(l, target=t_frame)] for l in get_layers(target=t_layer)]
-    flattened = list(itertools.chain.from_iterable(turbolist))
-    all_strokes = list(itertools.chain.from_iterable(flattened)) """
+    return list(iter_strokes(t_layer=t_layer, t_frame=t_frame, t_stroke=t_stroke))
 
-    all_strokes = []
+def frame_batches(t_layer='ALL', t_frame='ACTIVE', t_stroke='SELECT', batch_size=32):
+    '''
+    Target frames grouped by layer, in batches of at most batch_size frames
+    return list of (layer, frames) tuples, get strokes of a batch with batch_strokes
+    '''
+    batches = []
     for l in get_layers(target=t_layer):
-        for f in get_frames(l, target=t_frame):
-            for s in get_strokes(f, target=t_stroke):
-                all_strokes.append(s)
+        frames = list(get_frames(l, target=t_frame))
+        for i in range(0, len(frames), batch_size):
+            batches.append((l, frames[i:i+batch_size]))
+    return batches
+
+def batch_strokes(frames, t_stroke='SELECT'):
+    '''Target strokes of all given frames as a single list'''
+    return [s for f in frames for s in get_strokes(f, target=t_stroke)]
+
+def get_stroke_indexes(frame, target='SELECT'):
+    '''Indexes in frame.strokes of the strokes returned by get_strokes (selection read in one pass)'''
+    count = len(frame.strokes)
+    if not count:
+        return np.empty(0, dtype=np.int64)
+
+    if not target or target == 'SELECT':
+        select = np.empty(count, dtype=bool)
+        frame.strokes.foreach_get('select', select)
+        return np.flatnonzero(select)
+
+    elif target == 'ALL':
+        return np.arange(count)
+
+    elif target == 'LAST':
+        return np.array([get_last_index() % count])
+
+    return np.empty(0, dtype=np.int64)
+
+def strokes_at(strokes, ids):
+    '''
+    Strokes of a collection at given indexes, in collection order
+    The collection is iterated once (index access walk the stroke list from start each time)
+    '''
+    mask = np.zeros(len(strokes), dtype=bool)
+    mask[ids] = True
+    return [s for s, keep in zip(strokes, mask.tolist()) if keep]
+
+def name_key(name):
+    '''Stable integer key of a name (python hash is salted per session)'''
+    return zlib.crc32(name.encode('utf-8'))
 
-    return all_strokes
+def batch_strokes_seeds(layer, frames, t_stroke='SELECT', ob=None):
+    '''
+    Target strokes of given frames of layer (as batch_strokes)
+    and (S,) seeds derived from object, layer, frame number and stroke index
+    same strokes get same seeds on every run and machine (reproducible batch results)
+    '''
+    if ob is None:
+        ob = bpy.context.object
+    base = hash_seeds(name_key(ob.name), name_key(layer.info))
+    strokes = []
+    seeds = []
+    for f in frames:
+        ids = get_stroke_indexes(f, target=t_stroke)
+        strokes += strokes_at(f.strokes, ids)
+        seeds.append(hash_seeds(base, f.frame_number, ids))
+    return strokes, np.concatenate(seeds) if seeds else np.empty(0, dtype=np.uint64)
 
 def get_last_stroke(context=None):
     '''return last stroke (first if )'''
@@ -130,46 +225,84 @@ def get_last_index(context=None):
         context = bpy.context
     return 0 if context.tool_settings.use_gpencil_draw_onback else -1
 
+def get_stroke_lengths(strokes):
+    '''return an array of 3D length of each stroke (computed on a single buffer)'''
+    buf = StrokeBuffer(strokes, ('co',))
+    return stroke_lengths(buf['co'], buf.counts)
 
 ## -- overall attributes
 
-#TODO use a foreach_set on points for speed
 ## Line attributes
-def gp_add_line_attr(attr, amount, t_layer='SELECT', t_frame='ACTIVE', t_stroke='SELECT'):
+## strokes : optional stroke list to use instead of target filters (e.g: a frame batch)
+## frames : optional frame list to use instead of layer and frame filters (e.g: a frame batch)
+
+def edit_line_attr(attr, func, t_layer='SELECT', t_frame='ACTIVE', t_stroke='SELECT', strokes=None, frames=None):
+    '''
+    Apply func on a stroke attribute array (values of targeted strokes -> new values)
+    Read and write the whole strokes collection of each frame at once (target mask applied on array)
+    values are clamped to the property range (see gp_buffer.STROKE_ATTR_RANGE)
+    strokes : explicit stroke list instead of filters (plain list: values are set stroke by stroke)
+    frames : explicit frame list instead of layer and frame filters
+    '''
+    if strokes is not None:
+        set_strokes_attr(strokes, attr, func(get_strokes_attr(strokes, attr)))
+        return
+    if frames is None:
+        frames = (f for _l, f in iter_frames(t_layer=t_layer, t_frame=t_frame))
+    for f in frames:
+        ids = get_stroke_indexes(f, target=t_stroke)
+        if not len(ids):
+            continue
+        values = get_strokes_attr(f.strokes, attr)
+        values[ids] = func(values[ids])
+        set_strokes_attr(f.strokes, attr, values)
+
+def gp_add_line_attr(attr, amount, t_layer='SELECT', t_frame='ACTIVE', t_stroke='SELECT', strokes=None, frames=None):
     '''Get a stroke attribut, an int to Add, target filters'''
-    for s in strokelist(t_layer=t_layer, t_frame=t_frame, t_stroke=t_stroke):
-        setattr(s, attr, getattr(s, attr) + amount)
+    edit_line_attr(attr, lambda values: values + amount, t_layer=t_layer, t_frame=t_frame, t_stroke=t_stroke, strokes=strokes, frames=frames)
 
-def gp_set_line_attr(attr, amount, t_layer='SELECT', t_frame='ACTIVE', t_stroke='SELECT'):
-    for s in strokelist(t_layer=t_layer, t_frame=t_frame, t_stroke=t_stroke):
-        setattr(s, attr, amount)
+def gp_set_line_attr(attr, amount, t_layer='SELECT', t_frame='ACTIVE', t_stroke='SELECT', strokes=None, frames=None):
+    edit_line_attr(attr, lambda values: np.full(len(values), amount), t_layer=t_layer, t_frame=t_frame, t_stroke=t_stroke, strokes=strokes, frames=frames)
 
-## Points attributes
+## Points attributes (bulk foreach_get/foreach_set through StrokeBuffer)
 
-def gp_add_attr(attr, amount, t_layer='SELECT', t_frame='ACTIVE', t_stroke='SELECT'):
+def gp_add_attr(attr, amount, t_layer='SELECT', t_frame='ACTIVE', t_stroke='SELECT', strokes=None):
     '''Get a point attribut, an int to Add, target filters'''
-    for s in strokelist(t_layer=t_layer, t_frame=t_frame, t_stroke=t_stroke):
-        for p in s.points:
-            setattr(p, attr, getattr(p, attr) + amount)
-            
-def gp_set_attr(attr, amount, t_layer='SELECT', t_frame='ACTIVE', t_stroke='SELECT'):
-    for s in strokelist(t_layer=t_layer, t_frame=t_frame, t_stroke=t_stroke):
-        for p in s.points:
-            setattr(p, attr, amount)
+    for batch in iter_stroke_batches(t_layer=t_layer, t_frame=t_frame, t_stroke=t_stroke, strokes=strokes):
+        buf = StrokeBuffer(batch, (attr,))
+        buf[attr] += amount
+        buf.write(attr)
+
+def gp_set_attr(attr, amount, t_layer='SELECT', t_frame='ACTIVE', t_stroke='SELECT', strokes=None):
+    for batch in iter_stroke_batches(t_layer=t_layer, t_frame=t_frame, t_stroke=t_stroke, strokes=strokes):
+        buf = StrokeBuffer(batch, (attr,))
+        buf[attr] = amount
+        buf.write(attr)
 
 ## Point vertex color
 
-def gp_add_vg_alpha(amount, t_layer='SELECT', t_frame='ACTIVE', t_stroke='SELECT'):
+def gp_add_vg_alpha(amount, t_layer='SELECT', t_frame='ACTIVE', t_stroke='SELECT', strokes=None):
     '''Get a point attribut, an int to Add, target filters'''
-    for s in strokelist(t_layer=t_layer, t_frame=t_frame, t_stroke=t_stroke):
-        for p in s.points:
-            p.vertex_color[-1] += amount # (*p.vertex_color[:3], p.vertex_color[-1] + amount)
+    for batch in iter_stroke_batches(t_layer=t_layer, t_frame=t_frame, t_stroke=t_stroke, strokes=strokes):
+        buf = StrokeBuffer(batch, ('vertex_color',))
+        buf['vertex_color'][:, 3] += amount
+        buf.write('vertex_color')
 
-def gp_set_vg_alpha(amount, t_layer='SELECT', t_frame='ACTIVE', t_stroke='SELECT'):
+def gp_set_vg_alpha(amount, t_layer='SELECT', t_frame='ACTIVE', t_stroke='SELECT', strokes=None):
     '''Get a point attribut, an int to Add, target filters'''
-    for s in strokelist(t_layer=t_layer, t_frame=t_frame, t_stroke=t_stroke):
-        for p in s.points:
-            p.vertex_color[-1] = amount
+    for batch in iter_stroke_batches(t_layer=t_layer, t_frame=t_frame, t_stroke=t_stroke, strokes=strokes):
+        buf = StrokeBuffer(batch, ('vertex_color',))
+        buf['vertex_color'][:, 3] = amount
+        buf.write('vertex_color')
+
+def gp_grade_vertex_color(color, mode='TINT', factor=1.0, t_layer='SELECT', t_frame='ACTIVE', t_stroke='SELECT', strokes=None):
+    '''Tint, multiply or blend points vertex color (RGBA) of targeted strokes with color (see gp_geometry.grade_colors)'''
+    for batch in iter_stroke_batches(t_layer=t_layer, t_frame=t_frame, t_stroke=t_stroke, strokes=strokes):
+        buf = StrokeBuffer(batch, ('vertex_color',))
+        if not buf.total:
+            continue
+        buf['vertex_color'] = grade_colors(buf['vertex_color'], color, mode=mode, factor=factor)
+        buf.write('vertex_color')
 
 ## -- thinner tips
 
@@ -194,25 +327,30 @@ def abs_thinner_tip(s, tip_len=5, middle=0):
             pt.pressure = middle
         e -= 1
 
-def get_tip_from_percentage(s, tip_len=20, variance=0):
+def thin_strokes_tips(strokes, tip_len=20, end_tip_len=None, variance=0, use_max=False, force_body=False,
+                      curve='LINEAR', curve_points=None, seeds=None):
     '''
-    Get a stroke and percentage
-    return points number and number of points given a percentage from tip to middle of stroke (100%)
+    Fade pressure of strokes tips, all strokes in one pass
+    tip_len, end_tip_len : start/end tip length as percentage of stroke points (end use tip_len if None)
+    variance : randomize the tip lengths of each stroke by given value (positive or negative)
+    seeds : (S,) stroke seeds for variance (see batch_strokes_seeds), default from stroke order in list
+    use_max : fade from max pressure of the stroke instead of the point pressure after the tip
+    force_body : put all non fading points to the stroke max pressure
+    curve : falloff profile in gp_geometry.FADE_CURVES, curve_points are the CUSTOM profile values
     '''
-    p_num = len(s.points)#total number of points
-    # limit = p_num//2#middle of the points
-    # if limit < 2:
-    if p_num < 4:
-        print ('Not enough points to thin tip correctly')
+    buf = StrokeBuffer(strokes, ('pressure',))
+    if not len(buf):
         return
-    if variance:
-        import random
-        tip_len = min(max(tip_len + random.randint(-variance, variance), 5),100)
-
-    # thin_range = int( limit * tip_len/100)+1 #unnacurate percentage (of half the line) in point number
-    thin_range = int(p_num * tip_len/100)+1 #unnacurate percentage in point number
-    print(f'zone: {thin_range}/{p_num}')#Dbg
-    return thin_range
+    # same random offset on both tips of a stroke
+    if seeds is None:
+        seeds = hash_seeds(np.arange(len(buf)))
+    offset = seeded_offsets(seeds, variance)
+    start_len = np.clip(tip_len + offset, 5, 100)
+    end_len = None if end_tip_len is None else np.clip(end_tip_len + offset, 5, 100)
+    pressure, changed = fade_stroke_tips(buf['pressure'], buf.counts, start_len, end_len,
+                                         use_max=use_max, force_body=force_body, curve=curve, curve_points=curve_points)
+    buf['pressure'] = pressure
+    buf.write('pressure', strokes=np.flatnonzero(changed))
 
 def reshape_rel_thinner_tip_percentage(s, tip_len=10, variance=0):
     '''
@@ -220,41 +358,19 @@ def reshape_rel_thinner_tip_percentage(s, tip_len=10, variance=0):
     value is a percentage (of half a line min 10 percent, max 100)
     variance randomize the tip_len by given value (positive or negative)
     '''
-    thin_range = get_tip_from_percentage(s, tip_len=tip_len, variance=variance)
-    # Get pressure of point to fade from as reference. 
-    #+1 To get one further point as a reference but dont affect it (no change if relaunch except if variance).
-    start_max = s.points[thin_range+1].pressure 
-    end_max = s.points[-thin_range-1].pressure  #-1 Same stuff
-    for i in range(thin_range):
-        # print(i, 'start ->', transfer_value(i, 0, thin_range, 0.1, start_max) )
-        # print(i, 'end ->', transfer_value(i, 0, thin_range, 0.1, end_max) )
-        s.points[i].pressure = transfer_value(i, 0, thin_range, 0.1, start_max)
-        s.points[-(i+1)].pressure = transfer_value(i, 0, thin_range, 0.1, end_max)
-
-    #average value ?
-    """ # get pressure of average max...
-    import statistics
-    pressure_list = [p.pressure for p in s.points if p.pressure > 0.1]
-    if not pressure_list:
-        pressure_list = [p.pressure for p in s.points if p.pressure]
-    average = statistics.mean(pressure_list)"""
-    return 0
+    thin_strokes_tips([s], tip_len=tip_len, variance=variance)
 
 def reshape_abs_thinner_tip_percentage(s, tip_len=10, variance=0):
     '''
     Make points's pressure of strokes thinner by a point number percentage value (on total)
     All stroke will get max value
     '''
-    thin_range = get_tip_from_percentage(s, tip_len=tip_len, variance=variance)
-    max_pressure = max([p.pressure for p in s.points])
-    for i in range(thin_range):#TODO : Transfer based on a curve to avoid straight fade.
-        s.points[i].pressure = transfer_value(i, 0, thin_range, 0.1, max_pressure)
-        s.points[-(i+1)].pressure = transfer_value(i, 0, thin_range, 0.1, max_pressure)
+    thin_strokes_tips([s], tip_len=tip_len, variance=variance, use_max=True)
 
 def info_pressure(t_layer='ACTIVE', t_frame='ACTIVE', t_stroke='SELECT'):
     '''print the pressure of targeted strokes'''
     print('\nPressure list:')
-    for s in strokelist(t_layer=t_layer, t_frame=t_frame, t_stroke=t_stroke):
+    for s in iter_strokes(t_layer=t_layer, t_frame=t_frame, t_stroke=t_stroke):
         print(['{:.3f}'.format(p.pressure) for p in s.points])
 
 
@@ -279,7 +395,7 @@ p_attrs = ['co',
 def inspect_points(t_layer='ACTIVE', t_frame='ACTIVE', t_stroke='SELECT', all_infos=False):
     '''print full points infos of targeted strokes'''
     print('\nPoint infos:')
-    for s in strokelist(t_layer=t_layer, t_frame=t_frame, t_stroke=t_stroke):
+    for s in iter_strokes(t_layer=t_layer, t_frame=t_frame, t_stroke=t_stroke):
         if s.select:
             # print(l.info)
             if all_infos:
@@ -294,15 +410,14 @@ def inspect_points(t_layer='ACTIVE', t_frame='ACTIVE', t_stroke='SELECT', all_in
 def inspect_strokes(t_layer='ACTIVE', t_frame='ACTIVE', t_stroke='SELECT', all_infos=False):
     '''print full points infos of targeted strokes'''
     print('\nStrokes infos:')
-    for s in strokelist(t_layer=t_layer, t_frame=t_frame, t_stroke=t_stroke):
-        if s.select:
-            # print(l.info)
-            for at in s_attrs:
-                if not hasattr(s, at):
-                    continue  
-                print(f'  {at} : {getattr(s, at)}')
-            print(f'   points : {len(s.points)}')
-            print(f'   length : {get_stroke_length(s)}')
+    strokes = [s for s in iter_strokes(t_layer=t_layer, t_frame=t_frame, t_stroke=t_stroke) if s.select]
+    for s, length in zip(strokes, get_stroke_lengths(strokes)):
+        for at in s_attrs:
+            if not hasattr(s, at):
+                continue
+            print(f'  {at} : {getattr(s, at)}')
+        print(f'   points : {len(s.points)}')
+        print(f'   length : {length}')
 
 def thin_stroke_tips(tip_len=5, middle=0, t_layer='ACTIVE', t_frame='ACTIVE', t_stroke='SELECT'):
     '''Thin tips of strokes on target layers/frames/strokes defaut (active layer > active frame > selected strokes)'''
@@ -311,10 +426,25 @@ def thin_stroke_tips(tip_len=5, middle=0, t_layer='ACTIVE', t_frame='ACTIVE', t_
             for s in get_strokes(f, target=t_stroke):
                 abs_thinner_tip(s, tip_len=5, middle=0)
 
-def thin_stroke_tips_percentage(tip_len=30, variance=0, t_layer='ALL', t_frame='ACTIVE', t_stroke='SELECT'):
-    '''Thin tips of strokes on target layers/frames/strokes defaut (active layer > active frame > selected strokes)'''
-    for s in strokelist(t_layer=t_layer, t_frame=t_frame, t_stroke=t_stroke):
-        reshape_rel_thinner_tip_percentage(s, tip_len=tip_len, variance=variance)
+def thin_stroke_tips_percentage(tip_len=30, variance=0, t_layer='ALL', t_frame='ACTIVE', t_stroke='SELECT', strokes=None,
+                                end_tip_len=None, force_max=False, curve='LINEAR', curve_points=None, seed=0, seeds=None):
+    '''
+    Thin tips of strokes on target layers/frames/strokes defaut (active layer > active frame > selected strokes)
+    force_max : fade from stroke max pressure and set it on the line body
+    variance is seeded per stroke (object, layer, frame, stroke index and seed), relaunch give the same result
+    seeds : (S,) seeds of given strokes (see batch_strokes_seeds), default from stroke order in list
+    '''
+    settings = dict(tip_len=tip_len, end_tip_len=end_tip_len, variance=variance,
+                    use_max=force_max, force_body=force_max, curve=curve, curve_points=curve_points)
+    if strokes is not None:
+        if seeds is None:
+            seeds = np.arange(len(strokes))
+        thin_strokes_tips(strokes, seeds=hash_seeds(seed, seeds), **settings)
+        return
+    for layer, frames in frame_batches(t_layer=t_layer, t_frame=t_frame, t_stroke=t_stroke):
+        batch, seeds = batch_strokes_seeds(layer, frames, t_stroke=t_stroke)
+        if batch:
+            thin_strokes_tips(batch, seeds=hash_seeds(seed, seeds), **settings)
 
 ## -- Trim / Progressive erase
 
@@ -336,9 +466,7 @@ def trim_tip_point(context, endpoint=True):
             else:
                 last.points.pop(index=0)
         else:# erase line
-            for _ in range( len(last.points) ):
-                last.points.pop()
-            layer.active_frame.strokes.remove(last)
+            delete_stroke(layer.active_frame.strokes, last)
         return
 
     ### filters
@@ -351,16 +479,35 @@ def trim_tip_point(context, endpoint=True):
                     else:
                         s.points.pop(index=0)
                 else:# erase line
-                    for i in range( len(s.points) ):
-                        s.points.pop()
-                    f.strokes.remove(s)
+                    delete_stroke(f.strokes, s)
 
 #TODO - preserve tip triming (option or another func), (need a "detect fade" function to give at with index the point really start to fade and offset that) 
 
 def delete_stroke(strokes, s):
-    for i in range(len(s.points)):
-        s.points.pop()#pop all point to update viewport
     strokes.remove(s)
+    strokes.id_data.update_tag()# refresh viewport (remove alone does not)
+
+def delete_stroke_range(frame, start, end):
+    '''
+    Remove strokes from index start to end (excluded) of frame, single viewport refresh
+    Clear the whole frame when range cover all strokes
+    Else each remove look up the stroke from the list head: removed in order, the next one is always
+    at index start, so cost is (end - start) * start (linear when deleting from the first stroke)
+    A clear and rebuild of kept strokes is not done: vertex group weights cannot be rebuilt from python
+    return number of deleted strokes
+    '''
+    strokes = frame.strokes
+    count = len(strokes)
+    start, end = max(start, 0), min(end, count)
+    if start >= end:
+        return 0
+    if start == 0 and end == count:
+        frame.clear()
+    else:
+        for s in strokes[start:end]:
+            strokes.remove(s)
+    strokes.id_data.update_tag()
+    return end - start
 
 def backup_point_as_dic(p):
     '''backup point as dic (same layer, no parent handling)'''
@@ -413,97 +560,86 @@ def to_straight_line(s, keep_points=True, influence=100, straight_pressure=True)
         return
 
     if straight_pressure:
-        mean_pressure = mean([p.pressure for p in s.points])#can use a foreach_get but might not be faster.
+        pressure = get_points_attr(s.points, 'pressure')
 
     if not keep_points:
         for i in range(p_len-2):
             s.points.pop(index=1)
         if straight_pressure:
             for p in s.points:
-                p.pressure = mean_pressure
+                p.pressure = float(pressure.mean())
 
     else:
-        A = s.points[0].co
-        B = s.points[-1].co
-        # ab_dist = vector_len_from_coord(A,B)
-        full_dist = get_stroke_length(s)
-        dist_from_start = 0.0
-        coord_list = []
-        
-        for i in range(1, p_len-1):# all but first and last
-            dist_from_start += vector_len_from_coord(s.points[i-1],s.points[i])
-            ratio = dist_from_start / full_dist
-            # dont apply directly (change line as we measure it in loop)
-            coord_list.append( point_from_dist_in_segment_3d(A, B, ratio) )
-        
-        # apply change
-        for i in range(1, p_len-1):
-            #s.points[i].co = coord_list[i-1]#direct super straight 100%
-            s.points[i].co = point_from_dist_in_segment_3d(s.points[i].co, coord_list[i-1], influence / 100)
+        straighten_strokes([s], influence=influence, straight_pressure=straight_pressure)
 
-        if straight_pressure:
-            # influenced pressure
-            for p in s.points:
-                p.pressure = p.pressure + ((mean_pressure - p.pressure) * (influence / 100))
+def straighten_strokes(strokes, influence=100, straight_pressure=True):
+    '''
+    Straight line between first and last point for all strokes at once (keep points)
+    straight_pressure : move pressure toward the stroke mean pressure by influence
+    '''
+    buf = StrokeBuffer(strokes, ('co',))
+    ids = np.flatnonzero(buf.counts > 2)# 1 or 2 points only, skip
+    if not len(ids):
+        return
+    buf['co'] = straighten_slices(buf['co'], buf.counts, ids, np.zeros_like(ids), buf.counts[ids] - 1, influence / 100)
+    buf.write('co', strokes=ids)
+
+    if straight_pressure:
+        # influenced pressure
+        buf['pressure'] = equalize_strokes(buf['pressure'], buf.counts, influence / 100, mask=buf.counts > 2)
+        buf.write('pressure', strokes=ids)
+
+def straighten_strokes_slices(strokes, stroke_slices, influence=100):
+    '''
+    Straighten slices of multiple strokes in one pass
+    stroke_slices : for each stroke, list of [start, end] point index (or None to skip), end can be the points count
+    '''
+    buf = StrokeBuffer(strokes, ('co',))
+    stroke_index, start, end = [], [], []
+    for i, slices in enumerate(stroke_slices):
+        for sl in slices or ():
+            stroke_index.append(i)
+            start.append(sl[0])
+            end.append(min(sl[1], buf.counts[i] - 1))
+    if not stroke_index:
+        return
+    buf['co'] = straighten_slices(buf['co'], buf.counts, stroke_index, start, end, influence / 100)
+    buf.write('co', strokes=sorted(set(stroke_index)))
 
 
+def get_point_turns(strokes, matrix=None, view=None):
+    '''
+    Return StrokeBuffer of strokes and screen space turn angle at each point (nan on stroke tips)
+    projection and turns of the whole buffer are served from projection_cache when unchanged (e.g: redo panel)
+    '''
+    if view is None:
+        view = get_view()
+    buf = StrokeBuffer(strokes, ('co',))
+    return buf, projection_cache.get_projection(buf['co'], view, matrix=matrix, counts=buf.counts).point_turns
+
 #without reduce (may be faster)
 def gp_select_by_angle(tol, invert=False):
-    #print(strokelist(t_layer=t_layer, t_frame=t_frame, t_stroke=t_stroke))
-    for s in selected_strokes():
-        pnum = len(s.points)
-        if pnum >= 3:#need at least 3 points to calculate angle
-            for i in range(pnum-2):#skip two last -2
-                a = location_to_region(s.points[i].co)
-                b = location_to_region(s.points[i+1].co)
-                c = location_to_region(s.points[i+2].co)
-                ab = b-a
-                bc = c-b
-                
-                #test if fasted with numpy than built in angle method !!
-                angle = get_angle(ab,bc)
-                # direct_angle = degrees(ab.angle(bc))#angle_signed
-                # if abs(angle) > tol:
-                s.points[i+1].select = (abs(angle) > tol) ^ invert
+    buf, turns = get_point_turns(selected_strokes())
+    # need at least 3 points to calculate angle, tips keep their selection
+    inner = ~np.isnan(turns)
+    buf['select'][inner] = corner_mask(turns, tol, invert=invert)[inner]
+    buf.write('select')
 
 def gp_select_by_angle_reducted(tol, invert=False):
-    #print(strokelist(t_layer=t_layer, t_frame=t_frame, t_stroke=t_stroke))
-    for s in selected_strokes():
-        keys = []
-        pnum = len(s.points)
-        if pnum >= 3:#need at least 3 points to calculate angle
-            suite = []
-            for i in range(pnum-2):#skip two last -2
-                a = location_to_region(s.points[i].co)
-                b = location_to_region(s.points[i+1].co)
-                c = location_to_region(s.points[i+2].co)
-                ab = b-a
-                bc = c-b
-                
-                angle = get_angle(ab,bc)#test if fasted with numpy than built in angle method !
-                # direct_angle = degrees(ab.angle(bc))#angle_signed
-                absangle = abs(angle)
-
-                if absangle > tol:
-                    suite.append([i+1, absangle])
-                else:
-                    if suite:#suite has ended
-                        #first element of decreasing filtered list, then index of the points
-                        keys.append(sorted(suite, key=lambda x: x[1], reverse=True)[0][0])
-                        suite = []
-                
-            sel_list = [(i in keys) ^ invert for i in range(pnum)]
-            s.points.foreach_set('select', sel_list)
-            # s.points[i+1].select = abs(angle) > tol
-                    
-                #calculate vector from current and next and store only "key" points:
+    buf, turns = get_point_turns(selected_strokes())
+    stroke_index, keys = reduced_corners(turns, buf.counts, tol)
+    select = np.zeros(buf.total, dtype=bool)
+    select[buf.offsets[stroke_index] + keys] = True
+    buf.data['select'] = select ^ invert
+    # need at least 3 points to calculate angle
+    buf.write('select', strokes=np.flatnonzero(buf.counts >= 3))
 
 
 ### straight by slice and slices getters for polygonize
 
 def straight_stroke_slice(s, influence=100, slices=[], reduce=False, delete=False):
     if not slices:
-        slices = [0, len(s.points)]
+        slices = [[0, len(s.points)]]
 
     if delete:# remove points within slices range (influence is irelevant)
         
@@ -517,99 +653,39 @@ def straight_stroke_slice(s, influence=100, slices=[], reduce=False, delete=Fals
                 s.points.pop(index=pid)
         return
 
-    for sl in slices:
-        s_id, e_id = sl[0], sl[1]
-        if e_id >= len(s.points):
-            # print('len(s.points): ', len(s.points))
-            # print('e_id: ', e_id)
-            e_id = len(s.points) - 1
-
-        A = s.points[s_id].co
-        B = s.points[e_id].co
-        # ab_dist = vector_len_from_coord(A,B)
-        full_dist = sum( [vector_len_from_coord(s.points[i],s.points[i+1]) for i in range(s_id, e_id)] )
-        dist_from_start = 0.0
-        coord_list = []
-        
-        for i in range(s_id+1, e_id):#all but first and last
-            dist_from_start += vector_len_from_coord(s.points[i-1],s.points[i])
-            ratio = dist_from_start / full_dist
-            # dont apply directly (change line as we measure it in loop)
-            coord_list.append( point_from_dist_in_segment_3d(A, B, ratio) )
-        
-        for count, i in enumerate(range(s_id+1, e_id)):#e_id
-            #s.points[i].co = coord_list[i-1]#direct super straight 100%
-            s.points[i].co = point_from_dist_in_segment_3d(s.points[i].co, coord_list[count], influence / 100)
-    
-                
+    straighten_strokes_slices([s], [slices], influence=influence)
 
-def get_points_id_by_reduced_angles(s, tol):
-    #print(strokelist(t_layer=t_layer, t_frame=t_frame, t_stroke=t_stroke))
-    keys = []
-    pnum = len(s.points)
-    if pnum >= 3:#need at least 3 points to calculate angle
-        suite = []
-        for i in range(pnum-2):#skip two last -2
-            a = location_to_region(s.points[i].co)
-            b = location_to_region(s.points[i+1].co)
-            c = location_to_region(s.points[i+2].co)
-            ab = b-a
-            bc = c-b
-            
-            angle = get_angle(ab,bc)#test if fasted with numpy than built in angle method !
-            # direct_angle = degrees(ab.angle(bc))#angle_signed
-            absangle = abs(angle)
-
-            if absangle > tol:
-                suite.append([i+1, absangle])
-            else:
-                if suite:#suite has ended
-                    #first element of decreasing filtered list, then index of the points
-                    keys.append(sorted(suite, key=lambda x: x[1], reverse=True)[0][0])
-                    suite = []
-        if len(keys) > 1:
-            keys.insert(0, 0)#add first and last
-            keys.append(pnum)
-            pairs = [[keys[i], keys[i+1]] for i in range(len(keys)-1)]
-            return pairs
 
-def get_points_id_by_angles(s, tol, invert=False):
-    pnum = len(s.points)
-    pairs = []
-    prev = False
-    added = 0
-    if pnum >= 3:#need at least 3 points to calculate angle
-        for i in range(pnum-2):#skip two last -2
-            a = location_to_region(s.points[i].co)
-            b = location_to_region(s.points[i+1].co)
-            c = location_to_region(s.points[i+2].co)
-            ab = b-a
-            bc = c-b
-            angle = get_angle(ab,bc)
-            # s.points[i+1].select = (abs(angle) > tol) ^ invert
-            if not (abs(angle) > tol) ^ invert:#check without not and invert after if needed...
-                added +=1
-                if not prev:
-                    start = i+1
-                prev = True
-            else:
-                if prev:
-                    pairs.append([start, i+1])
-                    prev = False
+def get_polygon_pairs(strokes, tol, reduce=True):
+    '''
+    Slices to straighten for each stroke (None if nothing to straighten), all strokes evaluated at once
+    reduce : slices between sharpest points of corners chunks, else chunks of points under angle tolerance
+    '''
+    buf, turns = get_point_turns(strokes)
+    if reduce:
+        return reduced_corner_pairs(turns, buf.counts, tol)
+    return straight_chunk_pairs(turns, buf.counts, tol)
 
-        if added > 1:
-            return pairs
+def get_points_id_by_reduced_angles(s, tol):
+    return get_polygon_pairs([s], tol, reduce=True)[0]
 
-def gp_polygonize(s, tol, influence=100, reduce=True, delete=False):#, t_layer='ALL', t_frame='ACTIVE', t_stroke='SELECT'
-    #print(strokelist(t_layer=t_layer, t_frame=t_frame, t_stroke=t_stroke))
-    if reduce:
-        pairs = get_points_id_by_reduced_angles(s, tol)
-    else:
-        pairs = get_points_id_by_angles(s, tol)
-    
-    # print('pairs: ', pairs)
-    if pairs:
-        straight_stroke_slice(s, influence, pairs, reduce=reduce, delete=delete)
+def get_points_id_by_angles(s, tol, invert=False):
+    buf, turns = get_point_turns([s])
+    return straight_chunk_pairs(turns, buf.counts, tol, invert=invert)[0]
+
+def gp_polygonize(s, tol, influence=100, reduce=True, delete=False):
+    gp_polygonize_strokes([s], tol, influence=influence, reduce=reduce, delete=delete)
+
+def gp_polygonize_strokes(strokes, tol, influence=100, reduce=True, delete=False):
+    '''Polygonize a stroke list, corners of all strokes are detected in one pass'''
+    strokes = list(strokes)
+    stroke_pairs = get_polygon_pairs(strokes, tol, reduce=reduce)
+    if not delete:
+        straighten_strokes_slices(strokes, stroke_pairs, influence=influence)
+        return
+    for s, pairs in zip(strokes, stroke_pairs):
+        if pairs:
+            straight_stroke_slice(s, influence, pairs, reduce=reduce, delete=delete)
 
 
 def guess_join(same_material=True, proximity_tolerance=0.01, start_point_tolerance=6):
@@ -635,19 +711,31 @@ def guess_join(same_material=True, proximity_tolerance=0.01, start_point_toleran
     start_point_tolerance = len(last.points)-1 if start_point_tolerance >= len(last.points) else start_point_tolerance
     closes = []
     ct = 0
-    for s in pool:
-        for pid, p in enumerate(s.points):
-            for i in range(1 + start_point_tolerance):
-                if checkalign(location_to_region(p.co), location_to_region(last.points[i].co), tol=proximity_tolerance):#2D check #tol=0.01
-                    # print(f'{i} > {pid}')
-                    ct+=1
-                    found = True
-                    ### OLD :0 point index, 1 towards end or not (true false), 2 coordinate, 3 point obj, 4 stroke obj, 5 disance from reference point, index of point on last.
-                    ### 0 point index, 1 point, 2 stroke, 3 distance from reference point, 4 ref point index 
-                    closes.append([pid, p, s, vector_len_from_coord(last.points[i], p) , i])
-        
-        # if found:#Dont check for another close stroke that might overlap. (maybe change that later)
-        #     break
+    heads_co = get_points_attr(last.points, 'co')[:1 + start_point_tolerance]
+    heads_2d = location_to_region_batch(heads_co)
+
+    ## index projected points of the pool once, then only visit grid cells around each head point
+    buf = StrokeBuffer(pool, ('co',))
+    pool_2d = location_to_region_batch(buf['co'])
+    point_stroke = buf.stroke_index
+    radius = [isclose_radius(h, proximity_tolerance) for h in heads_2d if not np.isnan(h).any()]
+    grid = PointGrid(pool_2d, max(radius, default=0.0))
+
+    for i, head in enumerate(heads_2d):
+        if np.isnan(head).any():
+            continue
+        ids = grid.query_box(head, isclose_radius(head, proximity_tolerance))
+        ids = np.sort(ids[isclose_2d(pool_2d[ids], head, proximity_tolerance)])#2D check #tol=0.01
+        dists = np.linalg.norm(buf['co'][ids] - heads_co[i], axis=1)
+        for gid, dist in zip(ids, dists):
+            sid = point_stroke[gid]
+            pid = int(gid - buf.offsets[sid])
+            s = buf.strokes[sid]
+            ct+=1
+            found = True
+            ### OLD :0 point index, 1 towards end or not (true false), 2 coordinate, 3 point obj, 4 stroke obj, 5 disance from reference point, index of point on last.
+            ### 0 point index, 1 point, 2 stroke, 3 distance from reference point, 4 ref point index 
+            closes.append([pid, s.points[pid], s, float(dist), i])
     
     
     if found :
@@ -767,30 +855,9 @@ def circle_2d_closed(coord, r, num_segments):
     points.append(points[0])
     return points
 
-def magnet_on_target(src, tgt):
+def magnet_on_target(src, tgt, chunk_size=2048):
     '''Proximity transfer from a 2d coord list to another'''
-    import mathutils
-    casted_coord = []
-    for sp in src:
-        res = sp
-        prevdist = 100000
-        for i in range(len(tgt)-1):
-            pos, percentage = mathutils.geometry.intersect_point_line(sp, tgt[i], tgt[i+1])
-
-            if percentage <= 0:# at head
-                pos = tgt[i]
-            elif 1 <= percentage:# at tail
-                pos = tgt[i+1]
-
-            ## check if distance is shorter than previous
-            dist = (pos-sp).length
-            if dist < prevdist:
-                # dist can be 'nan', in this case does not enter condition, res equal sp
-                res = pos
-                prevdist = dist
-        
-        casted_coord.append(res)
-    return casted_coord
+    return [Vector(co) for co in magnet_on_polyline(src, tgt, chunk_size=chunk_size)]
 
 
 """ raw func
@@ -816,38 +883,62 @@ def to_circle_cast_to_average():
         p.co = ob.matrix_world.inverted() @ region_to_location(nco, p.co)# depth at p.co no good... need reproject """
 
 def to_circle_cast_to_average(ob, point_list, influence = 100, straight_pressure = False):
-    '''Project given points on 2d average points'''
+    '''
+    Project given points on 2d average points
+    Points behind the view are left untouched
+    return error message if there is not enough points in front of the view to fit a circle
+    '''
 
     ## TODO reproject on plane if strokes are found coplanar
     ## else reproject on axis given by current blend
 
-    coords = [location_to_region(ob.matrix_world @ p.co) for p in point_list]
-
-    ## Determine center : mean center ? -better fitting- bounding box (equivalent ?)
-    # center = Vector(np.median(coords, axis=0))
-    center = Vector(np.mean(coords, axis=0))# mean seem to have better placement than median for user
-
-    ## Determine radius (bounding box ? median length ?)
-    dist_list = [(center - co).length for co in coords]
-
-    radius = np.mean(dist_list)
-    # radius = np.median(dist_list)
-
-    circle = circle_2d_closed(center, radius, 128)#64
-
-    cast_coords = magnet_on_target(coords, circle)
-    for p, nco in zip(point_list, cast_coords):
-        ## /!\ depth at old point coordinate, jaggy depth... need custom reproject (or warn user to reproject) ?
-        new_co3d = ob.matrix_world.inverted() @ region_to_location(nco, p.co)
-        p.co = point_from_dist_in_segment_3d(p.co, new_co3d, influence / 100)
+    co = get_points_attr(point_list, 'co')
+    coords = location_to_region_batch(co, matrix=ob.matrix_world)
+    # points behind the view have no screen position (nan)
+    front = np.isfinite(coords).all(axis=1)
+    if np.count_nonzero(front) < 3:
+        return 'Not enough points in front of the view to make a circle'
+
+    ## Determine center and radius : mean center -better fitting- and mean distance
+    center, radius = fit_circle_2d(coords[front])
+
+    ## target is a circle: cast analytically instead of magnet_on_target over circle_2d_closed(center, radius, 128)
+    cast_coords = project_on_circle(coords[front], center, radius)
+    ## /!\ depth at old point coordinate, jaggy depth... need custom reproject (or warn user to reproject) ?
+    new_co3d = region_to_location_batch(cast_coords, co[front])
+    mat_inv = np.array(ob.matrix_world.inverted())
+    new_co3d = new_co3d @ mat_inv[:3, :3].T + mat_inv[:3, 3]
+    ratio = influence / 100
+    new_co = co.copy()
+    new_co[front] = (1 - ratio) * co[front] + ratio * new_co3d
+    set_points_attr(point_list, 'co', new_co)
     
     if straight_pressure:
-        m_pressure = np.median([p.pressure for p in point_list])
-        # m_pressure = np.mean([p.pressure for p in point_list])
-        for p in point_list:
-            # add a percentage of the difference
-            p.pressure = p.pressure + ((m_pressure - p.pressure) * (influence / 100))
-            # p.pressure = m_pressure #without influence
+        pressure = get_points_attr(point_list, 'pressure')
+        m_pressure = np.median(pressure)
+        # m_pressure = np.mean(pressure)
+        # add a percentage of the difference
+        set_points_attr(point_list, 'pressure', pressure + ((m_pressure - pressure) * (influence / 100)))
+
+def stroke_planes_infos(strokes, matrix=None):
+    '''
+    Fit a plane on each stroke in one pass (points transformed by matrix, default active object world matrix)
+    return StrokeBuffer, centers (S,3), normals (S,3), max deviation from plane (S,)
+    '''
+    if matrix is None:
+        matrix = bpy.context.object.matrix_world
+    buf = StrokeBuffer(strokes, ('co',))
+    centers, normals, deviation = stroke_planes(transform_points(buf['co'], matrix), buf.counts)
+    return buf, centers, normals, deviation
+
+def get_coplanar_strokes(strokes, tol=0.0002, matrix=None):
+    '''
+    Return a boolean array telling if each stroke is coplanar (with a tolerance)
+    and the array of plane normals
+    Strokes with less than 4 points are necessarily coplanar
+    '''
+    buf, _centers, normals, deviation = stroke_planes_infos(strokes, matrix=matrix)
+    return (deviation <= tol) | (buf.counts < 4), normals
 
 def is_coplanar_stroke(s, tol=0.0002, verbose=False) -> bool:
     '''
@@ -858,26 +949,11 @@ def is_coplanar_stroke(s, tol=0.0002, verbose=False) -> bool:
         # less than 4 points is necessarily coplanar
         return True 
 
-    obj = bpy.context.object
-    mat = obj.matrix_world
-    pct = len(s.points)
-    a = mat @ s.points[0].co
-    b = mat @ s.points[pct//3].co
-    c = mat @ s.points[pct//3*2].co
-
-    ab = b-a
-    ac = c-a
-
-    # get normal (perpendicular Vector)
-    plane_no = ab.cross(ac)#.normalized()
-
-    for i, p in enumerate(s.points):
-        ## let a tolerance value of at least 0.0002
-        # if abs(geometry.distance_point_to_plane(p.co, a, plane_no)) > tol:
-        if abs(geometry.distance_point_to_plane(mat @ p.co, a, plane_no)) > tol:
-            if verbose:
-                print(f'point{i} is not co-planar') # (distance to plane {geometry.distance_point_to_plane(p.co, a, plane_no)})
-            return False
+    _buf, _centers, _normals, deviation = stroke_planes_infos([s])
+    if deviation[0] > tol:
+        if verbose:
+            print(f'not co-planar (max distance to plane {deviation[0]})')
+        return False
     return True
 
 def get_coplanar_stroke_vector(s, tol=0.0002, verbose=False):
@@ -893,32 +969,9 @@ def get_coplanar_stroke_vector(s, tol=0.0002, verbose=False):
             print('less than 4 points')
         return
 
-    obj = bpy.context.object
-    mat = obj.matrix_world
-    pct = len(s.points)
-    a = mat @ s.points[0].co
-    b = mat @ s.points[pct//3].co
-    c = mat @ s.points[pct//3*2].co
-
-    """
-    a = s.points[0].co
-    b = s.points[1].co
-    c = s.points[-2].co
-    """
-    ab = b-a
-    ac = c-a
-
-    #get normal (perpendicular Vector)
-    plane_no = ab.cross(ac)#.normalized()
-    val = plane_no
-
-    # print('plane_no: ', plane_no)
-    for i, p in enumerate(s.points):
-        ## let a tolerance value of at least 0.0002 maybe more
-        # if abs(geometry.distance_point_to_plane(p.co, a, plane_no)) > tol:
-        if abs(geometry.distance_point_to_plane(mat @ p.co, a, plane_no)) > tol:
-            if verbose:
-                print(f'point{i} is not co-planar') # (distance to plane {geometry.distance_point_to_plane(p.co, a, plane_no)})
-            return
-            # val = None
-    return val
\ No newline at end of file
+    _buf, _centers, normals, deviation = stroke_planes_infos([s])
+    if deviation[0] > tol:
+        if verbose:
+            print(f'not co-planar (max distance to plane {deviation[0]})')
+        return
+    return Vector(normals[0])
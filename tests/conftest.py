@@ -0,0 +1,17 @@
+import os
+import sys
+import types
+
+## Tests of the bpy-free modules (run with a regular python: python -m pytest tests)
+## The addon folder is registered as an empty `gp_refine` package so relative imports work
+## without running the addon __init__ (which needs blender): `from gp_refine import gp_geometry`
+## Strokes stand-ins (foreach_get/foreach_set) come from benchmarks/synthetic.py
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if 'gp_refine' not in sys.modules:
+    pkg = types.ModuleType('gp_refine')
+    pkg.__path__ = [ROOT]
+    sys.modules['gp_refine'] = pkg
+
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
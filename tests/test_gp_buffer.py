@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+from gp_refine import gp_buffer
+from gp_refine.gp_buffer import StrokeBuffer, get_points_attr, set_points_attr, get_strokes_attr, set_strokes_attr
+import synthetic
+
+
+def make_strokes(counts, seed=0):
+    rng = np.random.default_rng(seed)
+    return [synthetic.FakeStroke(rng.random((n, 3)), pressure=rng.random(n), material_index=i % 3)
+            for i, n in enumerate(counts)]
+
+
+def test_fetch_layout():
+    strokes = make_strokes([3, 0, 5])
+    buf = StrokeBuffer(strokes, ('co', 'pressure'))
+    assert len(buf) == 3
+    assert buf.total == 8
+    assert buf.counts.tolist() == [3, 0, 5]
+    assert buf.offsets.tolist() == [0, 3, 3, 8]
+    assert buf.stroke_index.tolist() == [0, 0, 0, 2, 2, 2, 2, 2]
+    assert buf['co'].shape == (8, 3)
+    assert np.array_equal(buf['co'][buf.stroke_slice(2)], strokes[2].points.data['co'])
+    assert np.array_equal(buf['pressure'][:3], strokes[0].points.data['pressure'])
+
+def test_lazy_fetch():
+    buf = StrokeBuffer(make_strokes([2, 2]), ())
+    assert 'strength' not in buf.data
+    assert buf['strength'].tolist() == [1.0] * 4
+    assert buf['vertex_color'].shape == (4, 4)
+    assert buf['select'].dtype == bool
+
+def test_write_round_trip():
+    strokes = make_strokes([4, 6])
+    buf = StrokeBuffer(strokes, ('co', 'pressure'))
+    buf['co'] += 1.0
+    buf['pressure'] = np.linspace(0, 1, 10)
+    buf.write('co')
+    buf.write('pressure')
+    again = StrokeBuffer(strokes, ('co', 'pressure'))
+    assert np.array_equal(again['co'], buf['co'])
+    assert np.allclose(again['pressure'], np.linspace(0, 1, 10))
+
+def test_write_subset():
+    strokes = make_strokes([3, 3, 3])
+    before = [s.points.data['pressure'].copy() for s in strokes]
+    buf = StrokeBuffer(strokes, ('pressure',))
+    buf['pressure'] = 0.5
+    buf.write('pressure', strokes=[1])
+    assert np.array_equal(strokes[0].points.data['pressure'], before[0])
+    assert np.all(strokes[1].points.data['pressure'] == 0.5)
+    assert np.array_equal(strokes[2].points.data['pressure'], before[2])
+
+def test_write_clamp():
+    strokes = make_strokes([3])
+    buf = StrokeBuffer(strokes, ('strength', 'pressure'))
+    buf['strength'] = 2.0
+    buf['pressure'] = -1.0
+    buf.write('strength')
+    buf.write('pressure')
+    assert np.all(strokes[0].points.data['strength'] == 1.0)
+    assert np.all(strokes[0].points.data['pressure'] == 0.0)
+    buf['strength'] = 2.0
+    buf.write('strength', clamp=False)
+    assert np.all(strokes[0].points.data['strength'] == 2.0)
+
+def test_write_version():
+    buf = StrokeBuffer(make_strokes([3]), ('pressure', 'select'))
+    version = gp_buffer.write_version
+    buf.write('select')
+    assert gp_buffer.write_version == version
+    buf.write('pressure')
+    assert gp_buffer.write_version == version + 1
+
+@pytest.mark.parametrize('points_of', [lambda s: s.points, lambda s: list(s.points)])
+def test_points_attr_round_trip(points_of):
+    stroke = make_strokes([5])[0]
+    points = points_of(stroke)
+    co = get_points_attr(points, 'co')
+    assert np.array_equal(co, stroke.points.data['co'])
+    set_points_attr(points, 'co', co * 2)
+    set_points_attr(points, 'strength', [0.2, 0.4, 2.0, -1.0, 0.5])
+    assert np.allclose(stroke.points.data['co'], co * 2)
+    assert np.allclose(get_points_attr(points, 'strength'), [0.2, 0.4, 1.0, 0.0, 0.5])
+
+@pytest.mark.parametrize('collection', [synthetic.FakeStrokes, list])
+def test_strokes_attr_round_trip(collection):
+    strokes = collection(make_strokes([2, 2, 2]))
+    assert get_strokes_attr(strokes, 'material_index').tolist() == [0, 1, 2]
+    set_strokes_attr(strokes, 'line_width', [0, 20, 5000])
+    set_strokes_attr(strokes, 'hardness', [0.5, 0.0, 2.0])
+    assert get_strokes_attr(strokes, 'line_width').tolist() == [1, 20, 1000]
+    assert np.allclose(get_strokes_attr(strokes, 'hardness'), [0.5, 0.001, 1.0])
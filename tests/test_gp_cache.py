@@ -0,0 +1,39 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from gp_refine.gp_cache import ProjectionCache
+from gp_refine.gp_geometry import project_points, point_turn_angles
+from gp_refine.gp_buffer import StrokeBuffer
+import synthetic
+
+
+VIEW = SimpleNamespace(width=800, height=600, perspective_matrix=np.eye(4))
+
+
+def test_projection_matches_direct():
+    buf = StrokeBuffer(synthetic.polylines(strokes=6, points=20, seed=1), ('co',))
+    projection = ProjectionCache().get_projection(buf['co'], VIEW, counts=buf.counts)
+    co_2d = project_points(buf['co'], VIEW.perspective_matrix, VIEW.width, VIEW.height)
+    assert np.allclose(projection.co_2d, co_2d)
+    assert np.allclose(projection.point_turns, point_turn_angles(co_2d, buf.counts), equal_nan=True)
+
+def test_edited_stroke_only_miss():
+    cache = ProjectionCache()
+    buf = StrokeBuffer(synthetic.polylines(strokes=6, points=20, seed=1), ('co',))
+    cache.get_projection(buf['co'], VIEW, counts=buf.counts)
+    assert (cache.hits, cache.misses) == (0, 6)
+    co = buf['co'].copy()
+    co[buf.stroke_slice(2)] += 0.1
+    projection = cache.get_projection(co, VIEW, counts=buf.counts)
+    assert (cache.hits, cache.misses) == (5, 7)
+    assert np.allclose(projection.co_2d, project_points(co, VIEW.perspective_matrix, VIEW.width, VIEW.height))
+
+def test_view_change_miss():
+    cache = ProjectionCache()
+    co = synthetic.circles(strokes=1, points=16)[0].points.data['co']
+    first = cache.get_projection(co, VIEW)
+    assert cache.get_projection(co, VIEW) is first
+    other = SimpleNamespace(width=400, height=600, perspective_matrix=np.eye(4))
+    assert cache.get_projection(co, other) is not first
+    assert len(cache) == 2
@@ -0,0 +1,187 @@
+import math
+
+import numpy as np
+import pytest
+
+from gp_refine import gp_geometry as geo
+
+## Kernels against the per stroke python loops they replaced
+
+
+def random_strokes(counts, dim=3, seed=0):
+    rng = np.random.default_rng(seed)
+    co = np.cumsum(rng.normal(0, 1, (sum(counts), dim)), axis=0)
+    return co, np.asarray(counts, dtype=np.int64)
+
+def split(values, counts):
+    return np.split(values, np.cumsum(counts)[:-1])
+
+def get_angle(v0, v1):
+    return math.degrees(math.atan2(v0[0]*v1[1] - v0[1]*v1[0], v0[0]*v1[0] + v0[1]*v1[1]))
+
+def loop_turns(co_2d):
+    '''turn angle of points 1 to N-2 (None on tips), as the old selectors loops'''
+    turns = [None] * len(co_2d)
+    for i in range(len(co_2d) - 2):
+        a, b, c = co_2d[i], co_2d[i+1], co_2d[i+2]
+        turns[i+1] = get_angle(b - a, c - b)
+    return turns
+
+def loop_reduced_pairs(co_2d, tol):
+    '''old get_points_id_by_reduced_angles'''
+    keys = []
+    pnum = len(co_2d)
+    if pnum >= 3:
+        suite = []
+        turns = loop_turns(co_2d)
+        for i in range(pnum - 2):
+            absangle = abs(turns[i+1])
+            if absangle > tol:
+                suite.append([i+1, absangle])
+            elif suite:
+                keys.append(sorted(suite, key=lambda x: x[1], reverse=True)[0][0])
+                suite = []
+        if len(keys) > 1:
+            keys = [0] + keys + [pnum]
+            return [[keys[i], keys[i+1]] for i in range(len(keys) - 1)]
+
+def loop_straight_pairs(co_2d, tol):
+    '''old get_points_id_by_angles'''
+    pnum = len(co_2d)
+    pairs = []
+    prev = False
+    added = 0
+    if pnum >= 3:
+        turns = loop_turns(co_2d)
+        for i in range(pnum - 2):
+            if abs(turns[i+1]) <= tol:
+                added += 1
+                if not prev:
+                    start = i + 1
+                prev = True
+            elif prev:
+                pairs.append([start, i + 1])
+                prev = False
+        if added > 1:
+            return pairs
+
+def loop_straighten(co, pressure, influence):
+    '''old to_straight_line with keep_points'''
+    co = co.copy()
+    pressure = pressure.copy()
+    a, b = co[0].copy(), co[-1].copy()
+    full = sum(np.linalg.norm(co[i+1] - co[i]) for i in range(len(co) - 1))
+    dist = 0.0
+    targets = []
+    for i in range(1, len(co) - 1):
+        dist += np.linalg.norm(co[i] - co[i-1])
+        targets.append(a + (b - a) * (dist / full))
+    for i in range(1, len(co) - 1):
+        co[i] = co[i] + (targets[i-1] - co[i]) * influence
+    mean = pressure.mean()
+    pressure = pressure + (mean - pressure) * influence
+    return co, pressure
+
+def transfer_value(value, old_min, old_max, new_min, new_max):
+    return (((value - old_min) * (new_max - new_min)) / (old_max - old_min)) + new_min
+
+def loop_thin_tips(pressure, tip_len, use_max=False):
+    '''old reshape_rel_thinner_tip_percentage (reshape_abs_thinner_tip_percentage with use_max)'''
+    pressure = list(pressure)
+    thin_range = int(len(pressure) * tip_len / 100) + 1
+    if use_max:
+        start_max = end_max = max(pressure)
+    else:
+        start_max = pressure[thin_range + 1]
+        end_max = pressure[-thin_range - 1]
+    for i in range(thin_range):
+        pressure[i] = transfer_value(i, 0, thin_range, 0.1, start_max)
+        pressure[-(i+1)] = transfer_value(i, 0, thin_range, 0.1, end_max)
+    return pressure
+
+
+def test_point_turn_angles_match_loop():
+    co_2d, counts = random_strokes([0, 1, 2, 3, 7, 12], dim=2)
+    turns = geo.point_turn_angles(co_2d, counts)
+    expected = [t for stroke in split(co_2d, counts) for t in loop_turns(stroke)]
+    assert np.isnan(turns).tolist() == [t is None for t in expected]
+    assert np.allclose(turns[~np.isnan(turns)], [t for t in expected if t is not None])
+
+def test_point_turn_angles_ignore_other_strokes():
+    co_2d, counts = random_strokes([5, 6], dim=2)
+    shifted = co_2d.copy()
+    shifted[5:] += 1000
+    assert np.allclose(geo.point_turn_angles(co_2d, counts), geo.point_turn_angles(shifted, counts), equal_nan=True)
+
+@pytest.mark.parametrize('tol', [10, 40, 90])
+def test_corner_pairs_match_loops(tol):
+    co_2d, counts = random_strokes([2, 3, 8, 20, 40], dim=2, seed=1)
+    turns = geo.point_turn_angles(co_2d, counts)
+    strokes = split(co_2d, counts)
+    assert geo.reduced_corner_pairs(turns, counts, tol) == [loop_reduced_pairs(s, tol) for s in strokes]
+    assert geo.straight_chunk_pairs(turns, counts, tol) == [loop_straight_pairs(s, tol) for s in strokes]
+
+def test_stroke_lengths_match_loop():
+    co, counts = random_strokes([0, 1, 2, 10])
+    expected = [sum(np.linalg.norm(s[i+1] - s[i]) for i in range(len(s) - 1)) for s in split(co, counts)]
+    assert np.allclose(geo.stroke_lengths(co, counts), expected)
+
+@pytest.mark.parametrize('method, func', [('MEAN', np.mean), ('MEDIAN', np.median), ('MIN', np.min), ('MAX', np.max)])
+def test_stroke_reduce_match_numpy(method, func):
+    values = np.random.default_rng(2).random(21)
+    counts = [4, 0, 1, 6, 10]
+    res = geo.stroke_reduce(values, counts, method)
+    assert np.isnan(res[1])
+    expected = [func(v) for v in split(values, counts) if len(v)]
+    assert np.allclose(res[[0, 2, 3, 4]], expected)
+
+def test_stroke_reduce_unknown_method():
+    with pytest.raises(ValueError):
+        geo.stroke_reduce([1.0], [1], 'SUM')
+
+@pytest.mark.parametrize('influence', [1.0, 0.5])
+def test_straighten_match_loop(influence):
+    co, counts = random_strokes([3, 8, 15])
+    pressure = np.random.default_rng(3).random(len(co))
+    ids = np.arange(len(counts))
+    new_co = geo.straighten_slices(co, counts, ids, np.zeros_like(ids), counts - 1, influence)
+    new_pressure = geo.equalize_strokes(pressure, counts, influence)
+    for s_co, s_pressure, n_co, n_pressure in zip(split(co, counts), split(pressure, counts),
+                                                  split(new_co, counts), split(new_pressure, counts)):
+        expected_co, expected_pressure = loop_straighten(s_co, s_pressure, influence)
+        assert np.allclose(n_co, expected_co)
+        assert np.allclose(n_pressure, expected_pressure)
+
+def test_straighten_slices_keep_other_points():
+    co, counts = random_strokes([10, 10])
+    new_co = geo.straighten_slices(co, counts, [1], [2], [6])
+    assert np.array_equal(new_co[:13], co[:13])
+    assert np.array_equal(new_co[16:], co[16:])
+    # inner points lie on the slice segment
+    a, b = co[12], co[16]
+    cross = np.cross(new_co[13:16] - a, b - a)
+    assert np.allclose(cross, 0)
+
+@pytest.mark.parametrize('use_max', [False, True])
+@pytest.mark.parametrize('tip_len', [10, 20, 30])
+def test_fade_stroke_tips_match_loop(tip_len, use_max):
+    counts = np.array([10, 25, 40])
+    pressure = np.random.default_rng(4).uniform(0.3, 1.0, counts.sum())
+    values, changed = geo.fade_stroke_tips(pressure, counts, tip_len, use_max=use_max)
+    assert changed.all()
+    for new, old in zip(split(values, counts), split(pressure, counts)):
+        assert np.allclose(new, loop_thin_tips(old, tip_len, use_max=use_max))
+
+def test_fade_stroke_tips_skip_short_strokes():
+    pressure = np.ones(5)
+    values, changed = geo.fade_stroke_tips(pressure, [3, 2], 20)
+    assert not changed.any()
+    assert np.array_equal(values, pressure)
+
+def test_seeded_offsets_reproducible_in_range():
+    seeds = geo.hash_seeds(1, 2, np.arange(1000))
+    assert np.array_equal(seeds, geo.hash_seeds(1, 2, np.arange(1000)))
+    assert len(np.unique(seeds)) == 1000
+    offsets = geo.seeded_offsets(seeds, 10)
+    assert np.all(np.abs(offsets) <= 10)
+    assert not np.all(offsets == offsets[0])
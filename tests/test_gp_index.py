@@ -0,0 +1,133 @@
+import types
+
+import numpy as np
+import pytest
+
+from gp_refine import gp_index
+from gp_refine.gp_index import StrokeIndex, FrameIndexCache
+from gp_refine.gp_buffer import StrokeBuffer
+import synthetic
+
+
+class Data(synthetic.FakeGpencilData):
+    def as_pointer(self):
+        return id(self)
+
+
+class Frame(synthetic.FakeFrame):
+    def __init__(self, strokes, data=None):
+        super().__init__(strokes)
+        self.id_data = data or Data()
+
+    def as_pointer(self):
+        return id(self)
+
+
+@pytest.fixture
+def strokes():
+    return synthetic.noisy_lines(strokes=12, points=15, seed=3) + synthetic.circles(strokes=3, points=32, seed=3)
+
+
+def test_index_fields(strokes):
+    index = StrokeIndex.from_strokes(strokes)
+    assert len(index) == len(strokes)
+    for i, s in enumerate(strokes):
+        co = s.points.data['co'].astype(np.float64)
+        pressure = s.points.data['pressure']
+        assert index.count[i] == len(co)
+        assert np.isclose(index.length[i], np.linalg.norm(np.diff(co, axis=0), axis=1).sum())
+        assert np.allclose(index.bounds_min[i], co.min(axis=0))
+        assert np.allclose(index.bounds_max[i], co.max(axis=0))
+        assert np.allclose(index.center[i], co.mean(axis=0))
+        assert np.isclose(index.pressure_mean[i], pressure.mean())
+        assert np.isclose(index.pressure_max[i], pressure.max())
+        assert np.isclose(index.reduce('strength', 'MIN')[i], 1.0)
+    assert index.reduce('pressure', 'MEDIAN') is None
+
+def test_index_plane():
+    # synthetic circles are drawn on the XY plane
+    index = StrokeIndex.from_strokes(synthetic.circles(strokes=5, points=32, seed=3))
+    assert np.allclose(np.abs(index.normal[:, 2]), 1.0)
+    assert np.allclose(index.planarity, 0.0, atol=1e-6)
+    assert np.allclose(index.direction[:, 2], 0.0, atol=1e-6)
+
+def test_index_key():
+    index = StrokeIndex(StrokeBuffer([], gp_index.INDEX_ATTRS), key=(0, 1, 2))
+    assert len(index) == 0
+    assert index.key == (0, 1, 2)
+
+def test_cache_hit(strokes):
+    cache = FrameIndexCache()
+    frame = Frame(strokes)
+    index = cache.get_index(frame)
+    assert cache.get_index(frame) is index
+    assert len(cache) == 1
+
+def test_cache_invalidated_by_stroke_count(strokes):
+    cache = FrameIndexCache()
+    frame = Frame(strokes)
+    index = cache.get_index(frame)
+    frame.strokes.pop()
+    assert len(cache.get_index(frame)) == len(index) - 1
+
+def test_cache_invalidated_by_point_count(strokes):
+    cache = FrameIndexCache()
+    frame = Frame(strokes)
+    index = cache.get_index(frame)
+    frame.strokes[0].points.pop()
+    new = cache.get_index(frame)
+    assert new is not index
+    assert new.count[0] == index.count[0] - 1
+
+def test_cache_invalidated_by_buffer_write(strokes):
+    cache = FrameIndexCache()
+    frame = Frame(strokes)
+    index = cache.get_index(frame)
+    buf = StrokeBuffer(frame.strokes, ('co',))
+    buf['co'] *= 2
+    buf.write('co')
+    new = cache.get_index(frame)
+    assert new is not index
+    assert np.allclose(new.length, index.length * 2)
+
+def test_cache_keep_on_selection_write(strokes):
+    cache = FrameIndexCache()
+    frame = Frame(strokes)
+    index = cache.get_index(frame)
+    buf = StrokeBuffer(frame.strokes, ('select',))
+    buf['select'] = True
+    buf.write('select')
+    assert cache.get_index(frame) is index
+
+def test_cache_invalidated_by_depsgraph_update(strokes):
+    cache = FrameIndexCache()
+    frame = Frame(strokes[:6])
+    other = Frame(strokes[6:])
+    index = cache.get_index(frame)
+    other_index = cache.get_index(other)
+
+    def depsgraph(data, identifier='GreasePencil', geometry=True):
+        update = types.SimpleNamespace(is_updated_geometry=geometry,
+                                       id=types.SimpleNamespace(original=data,
+                                                                bl_rna=types.SimpleNamespace(identifier=identifier)))
+        return types.SimpleNamespace(updates=[update])
+
+    gp_index.tag_depsgraph_update(depsgraph(frame.id_data, identifier='Object'))
+    gp_index.tag_depsgraph_update(depsgraph(frame.id_data, geometry=False))
+    assert cache.get_index(frame) is index
+    gp_index.tag_depsgraph_update(depsgraph(frame.id_data))
+    assert cache.get_index(frame) is not index
+    # other datablocks are kept
+    assert cache.get_index(other) is other_index
+
+def test_cache_lru(strokes):
+    cache = FrameIndexCache(max_frames=2)
+    frames = [Frame(strokes[i:i+3]) for i in range(3)]
+    first = cache.get_index(frames[0])
+    cache.get_index(frames[1])
+    cache.get_index(frames[0])# most recent
+    cache.get_index(frames[2])
+    assert len(cache) == 2
+    assert cache.get_index(frames[0]) is first
+    cache.invalidate(frames[0])
+    assert cache.get_index(frames[0]) is not first
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from gp_refine.gp_query import Query, QueryError
+
+FIELDS = {
+'length': np.array([0.005, 0.02, 0.5, 0.008]),
+'points': np.array([2, 10, 50, 3]),
+'angle': np.array([-89.0, -45.0, 10.0, np.nan]),
+'pressure_mean': np.array([0.3, 0.8, 0.5, 0.2]),
+'pressure_max': np.array([0.5, 1.0, 0.9, 0.3]),
+'material': np.array([0, 1, 0, 2]),
+}
+
+def run(expression):
+    return Query(expression)(FIELDS.__getitem__, 4).tolist()
+
+
+@pytest.mark.parametrize('expression, fields', [
+    ('length < 0.01', {'length'}),
+    ('length < 0.01 and pressure < 0.4', {'length', 'pressure_mean'}),
+    ('max(pressure) > 0.5 or points >= 10', {'pressure_max', 'points'}),
+    ('angle ~ -45±20', {'angle'}),
+    ('not material == 1', {'material'}),
+])
+def test_fields(expression, fields):
+    assert Query(expression).fields == fields
+
+@pytest.mark.parametrize('expression, expected', [
+    ('length < 0.01', [True, False, False, True]),
+    ('length < 0.01 and pressure < 0.25', [False, False, False, True]),
+    ('max(pressure) > 0.95 or points < 3', [True, True, False, False]),
+    ('0.01 < length < 1', [False, True, True, False]),
+    ('not material == 0', [False, True, False, True]),
+    ('points > -1', [True, True, True, True]),
+    ('material != 0', [False, True, False, True]),
+])
+def test_evaluate(expression, expected):
+    assert run(expression) == expected
+
+@pytest.mark.parametrize('expression', ['angle ~ -45±20', 'angle ~ -45+-20', 'angle ~ -45 +/- 20', 'near(angle, -45, 20)'])
+def test_near(expression):
+    # nan angle never match
+    assert run(expression) == [False, True, False, False]
+
+def test_near_angle_fold():
+    # -89 is close to 90 (both vertical)
+    assert run('angle ~ 90±5') == [True, False, False, False]
+
+def test_constant_result_broadcast():
+    assert run('1 < 2') == [True] * 4
+
+@pytest.mark.parametrize('expression', [
+    'length <',
+    'color > 1',
+    'sum(pressure) > 1',
+    'mean(length) > 1',
+    'mean(pressure, strength) > 1',
+    'length + 1 > 2',
+    'length in (1, 2)',
+    'length is 1',
+    '"a" == length',
+    'length.real > 1',
+    '__import__("os")',
+    'near()',
+    'near(length)',
+    'near(length, 2)',
+    'near(length, 1, 2, 3)',
+    'near(length, 1, tolerance=2)',
+    'near(length, points, 2)',
+    'True',
+])
+def test_errors(expression):
+    with pytest.raises(QueryError):
+        Query(expression)
@@ -51,7 +51,13 @@ class GPREFINE_PT_thin_tips(GPR_refine, Panel):
         else:
             layout.prop(context.scene.gprsettings, 'percentage_start_tip_len')
             layout.prop(context.scene.gprsettings, 'percentage_end_tip_len')
+        row = layout.row(align=True)
+        row.prop(context.scene.gprsettings, 'percentage_tip_len_random')
+        row.prop(context.scene.gprsettings, 'percentage_tip_len_seed')
         layout.prop(context.scene.gprsettings, 'force_max_pressure_line_body')
+        layout.prop(context.scene.gprsettings, 'tip_fade_curve')
+        if context.scene.gprsettings.tip_fade_curve == 'CUSTOM':
+            layout.prop(context.scene.gprsettings, 'tip_fade_curve_points')
         layout.operator('gp.refine_strokes').action = 'THIN_RELATIVE'#, icon='GREASEPENCIL'
         layout.label(text="Those settings only affect additive or eraser mode")
 
@@ -83,6 +89,10 @@ class GPREFINE_PT_Selector(GPR_refine, Panel):
         layout.operator('gp.attribute_selector')
         layout.operator('gp.coplanar_selector')
 
+        row = layout.row(align=True)
+        row.prop(context.scene.gprsettings, 'smart_query', text='')
+        row.operator('gp.smart_select', text='', icon='VIEWZOOM').query = context.scene.gprsettings.smart_query
+
         layout.label(text='Points:')
         row = layout.row()
         row.operator('gp.select_by_angle', icon='PARTICLE_POINT')
@@ -147,6 +157,15 @@ class GPREFINE_PT_thickness_opacity(GPR_refine, Panel):
         row.prop(context.scene.gprsettings, 'set_alpha')
         row.operator('gp.refine_strokes', text='Set alpha').action = 'SET_ALPHA'
 
+        col = layout.column(align=True)
+        row = col.row()
+        row.prop(context.scene.gprsettings, 'grade_color', text='')
+        row.prop(context.scene.gprsettings, 'grade_factor')
+        row = col.row(align=True)
+        row.operator('gp.refine_strokes', text='Tint').action = 'TINT_COLOR'
+        row.operator('gp.refine_strokes', text='Multiply').action = 'MULTIPLY_COLOR'
+        row.operator('gp.refine_strokes', text='Blend').action = 'BLEND_COLOR'
+
 
 class GPREFINE_PT_stroke_shape_refine(GPR_refine, Panel):
     bl_label = "Stroke reshape"#"Strokes filters"
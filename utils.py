@@ -3,6 +3,9 @@ import mathutils
 from mathutils import Vector
 import math
 import numpy as np
+from collections import namedtuple
+from .gp_geometry import project_points, unproject_points, stroke_lengths
+from .gp_buffer import get_points_attr
 
 
 def convertAttr(Attr):
@@ -24,6 +27,64 @@ def region_to_location(viewcoords, depthcoords):
     from bpy_extras import view3d_utils
     return view3d_utils.region_2d_to_location_3d(bpy.context.region, bpy.context.space_data.region_3d, viewcoords, depthcoords)
 
+## Batch projection
+
+View = namedtuple('View', ['width', 'height', 'perspective_matrix', 'view_matrix', 'is_perspective'])
+
+class NoViewError(RuntimeError):
+    '''No 3D view region and no scene camera to project strokes on screen'''
+    pass
+
+def camera_view(scene=None, camera=None):
+    '''Return a View from the scene camera (render resolution as region size)'''
+    if not scene:
+        scene = bpy.context.scene
+    cam = camera or scene.camera
+    if not cam:
+        return
+    render = scene.render
+    width = render.resolution_x * render.resolution_percentage // 100
+    height = render.resolution_y * render.resolution_percentage // 100
+    proj = cam.calc_matrix_camera(bpy.context.evaluated_depsgraph_get(), x=width, y=height,
+                                  scale_x=render.pixel_aspect_x, scale_y=render.pixel_aspect_y)
+    view_matrix = cam.matrix_world.inverted()
+    return View(width, height, np.array(proj @ view_matrix), np.array(view_matrix), cam.data.type != 'ORTHO')
+
+def get_view(context=None):
+    '''
+    Return a View of the current 3D viewport region
+    Fallback to scene camera when there is no 3D region (e.g: background mode)
+    Raise NoViewError if there is neither
+    '''
+    if not context:
+        context = bpy.context
+    rv3d = getattr(context.space_data, 'region_3d', None)
+    if context.region and rv3d:
+        return View(context.region.width, context.region.height,
+                    np.array(rv3d.perspective_matrix), np.array(rv3d.view_matrix), rv3d.is_perspective)
+    view = camera_view(context.scene)
+    if view is None:
+        raise NoViewError(f'No 3D view and no camera in scene "{context.scene.name}" to compute screen space angles')
+    return view
+
+def location_to_region_batch(coords, matrix=None, view=None):
+    '''
+    Project (N,3) coordinates to (N,2) region coordinates in one pass
+    matrix : optional matrix applied before projection (e.g: ob.matrix_world)
+    Points behind the view are nan (location_to_region return None)
+    '''
+    if view is None:
+        view = get_view()
+    return project_points(coords, view.perspective_matrix, view.width, view.height,
+                          matrix=None if matrix is None else np.array(matrix))
+
+def region_to_location_batch(viewcoords, depthcoords, view=None):
+    '''Return (N,3) locations of (N,2) region coordinates at depth of (N,3) depthcoords'''
+    if view is None:
+        view = get_view()
+    return unproject_points(viewcoords, depthcoords, view.perspective_matrix, view.view_matrix,
+                            view.is_perspective, view.width, view.height)
+
 
 def transfer_value(Value, OldMin, OldMax, NewMin, NewMax):
     '''map a value from a range to another (transfer/translate value)'''
@@ -102,11 +163,7 @@ def debug_create_empty_from_vec(p,v):
 
 def get_stroke_length(s):
     '''return 3D total length of the stroke'''
-    all_len = 0.0
-    for i in range(0, len(s.points)-1):
-        #print(vector_len_from_coord(s.points[i],s.points[i+1]))
-        all_len += vector_len_from_coord(s.points[i],s.points[i+1])   
-    return (all_len)
+    return float(stroke_lengths(get_points_attr(s.points, 'co'), [len(s.points)])[0])
 
 
 def point_from_dist_in_segment_3d(a, b, ratio):
@@ -170,7 +227,7 @@ def get_angle_from_points(a, b, c):
 
 def get_angle(v0, v1):
     '''get two vector, return signed angle in degree'''
-    return np.degrees( np.math.atan2(np.linalg.det([v0,v1]),np.dot(v0,v1)) )
+    return math.degrees(math.atan2(v0[0]*v1[1] - v0[1]*v1[0], v0[0]*v1[0] + v0[1]*v1[1]))
 
 
 def get_ninety_angle_from(a, b):